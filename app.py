@@ -1,13 +1,45 @@
 
-from streamlit_option_menu import option_menu
-import streamlit as st
-import joblib
-import pandas as pd
-import numpy as np
-from PIL import Image
-import seaborn as sns
-import matplotlib.pyplot as plt
-from model_randomforest import *
+import os
+import sys
+import threading
+import time
+from profiling import PROFILER
+
+# Hanya modul ringan yang diimport di awal; model, numpy/pandas dan sklearn baru diimport
+# oleh warm-up di background atau saat Buddy Scan memprediksi (lihat load_model).
+# Waktu import per modul tercatat sebagai tahap 'import.*' di laporan profiling.
+with PROFILER.stage('import.streamlit'):
+    import streamlit as st
+    from streamlit_option_menu import option_menu
+with PROFILER.stage('import.PIL'):
+    from PIL import Image
+
+# Artifact model yang dilayani (Random Forest atau KNN), bisa diganti lewat environment variable
+ARTIFACT_DIR = os.environ.get('OBESITY_MODEL_DIR', 'models/model_random_forest')
+
+# Cache prediksi: jumlah entri maksimum dan pembulatan kolom numerik untuk kunci cache
+# (berat badan 70.04 dan 70.01 kg dianggap input yang sama)
+PREDICTION_CACHE_SIZE = int(os.environ.get('OBESITY_CACHE_SIZE', 4096))
+PREDICTION_CACHE_ROUNDING = {'Weight': 1, 'BMI': 1}
+
+# Faktor gaya hidup yang ditampilkan sebagai alasan prediksi Buddy Scan
+LIFESTYLE_FACTORS = {
+    'FAVC': 'Konsumsi makanan tinggi kalori',
+    'FCVC': 'Frekuensi makan sayur',
+    'NCP': 'Jumlah makan per hari',
+    'CAEC': 'Kebiasaan ngemil',
+    'SMOKE': 'Merokok',
+    'CH2O': 'Konsumsi air putih',
+    'SCC': 'Pemantauan kalori harian',
+    'FAF': 'Aktivitas fisik',
+    'TUE': 'Penggunaan perangkat teknologi',
+    'CALC': 'Konsumsi alkohol',
+    'MTRANS': 'Transportasi sehari-hari',
+}
+TOP_FACTORS = 3
+
+# Buddy Batch: jumlah baris CSV yang dibaca, di-encode dan diprediksi sekaligus
+BULK_CHUNK_SIZE = int(os.environ.get('OBESITY_BULK_CHUNK_SIZE', 20000))
 
 icon_image = Image.open('image/chubby.png')
 st.set_page_config(
@@ -16,14 +48,151 @@ st.set_page_config(
     layout="centered"
 )
 
+def model_version():
+    """
+    Penanda versi model yang sedang tersimpan; berubah setiap artifact (atau file .joblib) diganti.
+    """
+    if os.path.isdir(ARTIFACT_DIR):
+        with PROFILER.stage('import.model_artifact'):
+            from model_artifact import artifact_version
+        return artifact_version(ARTIFACT_DIR)
+    return str(os.path.getmtime('models/model_random_forest.joblib'))
+
+# show_spinner=False: fungsi ini juga dipanggil dari thread warm-up yang tidak punya konteks halaman
+@st.cache_resource(max_entries=1, show_spinner=False)
+def load_model(version):
+    """
+    Memuat model dan label encoders dari artifact (array di-mmap, cepat saat cold start).
+    Jika artifact belum ada, kembali ke file .joblib lama. Dimuat ulang saat version berubah.
+    """
+    with PROFILER.stage('app.load_model'):
+        if os.path.isdir(ARTIFACT_DIR):
+            with PROFILER.stage('import.model_artifact'):
+                from model_artifact import FEATURE_NAMES, load_artifact
+            return load_artifact(ARTIFACT_DIR, feature_names=FEATURE_NAMES)
+        with PROFILER.stage('import.joblib'):
+            import joblib
+        loaded_model = joblib.load('models/model_random_forest.joblib')
+        encoders = joblib.load('models/label_encoders.joblib')
+        return loaded_model, encoders
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def load_feature_encoder(version):
+    """
+    Menyusun tabel lookup encoding sekali saja dari label encoders.
+    """
+    with PROFILER.stage('import.feature_encoder'):
+        from feature_encoder import FeatureEncoder
+    _, encoders = load_model(version)
+    return FeatureEncoder(encoders)
+
+@st.cache_resource(show_spinner=False)
+def get_prediction_cache():
+    """
+    Satu cache LRU untuk seluruh sesi dalam proses ini.
+    """
+    with PROFILER.stage('import.prediction_cache'):
+        from prediction_cache import PredictionCache
+    return PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_ROUNDING)
+
+def _warm_up():
+    with PROFILER.stage('app.warm_up'):
+        version = model_version()
+        load_model(version)
+        load_feature_encoder(version)
+        get_prediction_cache()
+    if PROFILER.enabled:
+        # Laporan startup: waktu import per modul dan lama warm-up
+        for name, stage in PROFILER.report()['stages'].items():
+            if name.startswith('import.') or name in ('app.warm_up', 'app.load_model'):
+                print(f"[startup] {name:<28} {stage['total_s'] * 1000:8.1f} ms", file=sys.stderr)
+
 @st.cache_resource
-def load_model():
-    loaded_model = joblib.load('models/model_random_forest.joblib')
-    return loaded_model
+def start_warm_up():
+    """
+    Memuat model di thread background sekali per proses, supaya halaman statis tampil
+    tanpa menunggu dan prediksi pertama tidak perlu memuat model lagi.
+    """
+    thread = threading.Thread(target=_warm_up, name='model-warm-up', daemon=True)
+    thread.start()
+    return thread
 
-def load_label_encoders():
-    encoders = joblib.load('models/label_encoders.joblib')
-    return encoders
+def get_predictor():
+    """
+    Model, label encoders, feature encoder, cache prediksi dan versi artifact saat ini.
+    Menunggu warm-up selesai dulu agar model tidak dimuat dua kali.
+    """
+    start_warm_up().join()
+    version = model_version()
+    model, label_encoders = load_model(version)
+    feature_encoder = load_feature_encoder(version)
+    # Cache prediksi dikosongkan otomatis jika artifact berubah
+    prediction_cache = get_prediction_cache()
+    prediction_cache.validate(version)
+    return model, label_encoders, feature_encoder, prediction_cache, version
+
+def predict_proba_row(model, input_data):
+    """
+    Probabilitas kelas untuk satu baris terenkode, kelas prediksi, keterangan model, dan
+    kontribusi tiap fitur per kelas (None jika model tidak mendukungnya).
+    """
+    from model_randomforest import RandomForest
+    with PROFILER.stage('app.predict'):
+        if isinstance(model, RandomForest):
+            # Model lama tidak menyimpan distribusi kelas per node: tanpa penjelasan
+            if all(tree.tree.distribution is not None for tree in model.trees):
+                # Satu traversal semua pohon memberi label, proporsi suara dan kontribusi fitur sekaligus
+                predictions, proba, _, contributions = model.explain(input_data)
+                return proba[0], int(predictions[0]), f"{len(model.trees)} pohon dievaluasi", contributions[0]
+            # Prediksi: pohon dievaluasi per 25 dan berhenti begitu kelas teratas tidak bisa tersusul lagi
+            proba, n_trees_used = model.predict_proba(input_data, chunk_size=25, return_n_trees=True)
+            proba = proba[0]
+            prediction = int(proba.argmax())
+            if (proba == proba[prediction]).sum() > 1:
+                # Suara seri: argmax memilih indeks kelas terkecil, sedangkan forest memilih
+                # kelas seri yang dipilih pohon paling awal; pakai aturan forest
+                prediction = int(model.predict(input_data)[0])
+            return proba, prediction, f"{n_trees_used[0]} pohon dievaluasi", None
+        proba = model.predict_proba(input_data)[0]
+        return proba, int(proba.argmax()), f"{model.k} tetangga terdekat", None
+
+def top_lifestyle_factors(contributions, prediction, feature_names, n=TOP_FACTORS):
+    """
+    Faktor gaya hidup yang paling menaikkan peluang kelas prediksi, terbesar dulu.
+    """
+    factors = [(feature_names.index(name), name) for name in LIFESTYLE_FACTORS]
+    factors = [(contributions[i, prediction], name) for i, name in factors if contributions[i, prediction] > 0]
+    return sorted(factors, reverse=True)[:n]
+
+def score_upload(uploaded_file, progress):
+    """
+    Memprediksi CSV upload per chunk. Hanya satu chunk input yang diparse sekaligus;
+    yang disimpan hanya kolom prediksi (CSV, belasan byte per baris) untuk didownload.
+
+    Returns:
+        tuple: (isi CSV hasil dalam bytes, jumlah baris, detik).
+    """
+    import io
+    import pandas as pd
+    from batch_predict import predict_chunks
+
+    model, label_encoders, feature_encoder, _, _ = get_predictor()
+    labels = label_encoders['NObeyesdad'].classes_
+    start = time.perf_counter()
+    n_rows = 0
+    out = io.StringIO()
+    out.write('prediction\n')
+    uploaded_file.seek(0)
+    reader = pd.read_csv(uploaded_file, chunksize=BULK_CHUNK_SIZE)
+    with PROFILER.stage('app.bulk_predict'):
+        for chunk, predicted in predict_chunks(reader, model, feature_encoder, labels):
+            pd.Series(predicted).to_csv(out, header=False, index=False)
+            n_rows += len(chunk)
+            elapsed = time.perf_counter() - start
+            # Posisi baca file sebagai perkiraan kemajuan
+            progress.progress(min(uploaded_file.tell() / max(uploaded_file.size, 1), 1.0),
+                              text=f"{n_rows:,} baris diprediksi ({n_rows / elapsed:,.0f} baris/detik)")
+    return out.getvalue().encode(), n_rows, time.perf_counter() - start
 
 def load_css(file_name: str):
     with open(file_name) as f:
@@ -59,7 +228,7 @@ def is_valid_input(
     return radio_valid and select_valid
 
 def preprocess_input(
-    encoders,
+    encoder,
     gender, age, height, weight,
     family_history_with_overweight, favc, fcvc, ncp,
     caec, smoke, ch2o, scc, faf, tue,
@@ -68,77 +237,40 @@ def preprocess_input(
     """
     Melakukan preprocessing dan encoding terhadap data input dari form.
     """
-    # Mapping manual
-    fcvc_mapping = {"Tidak Pernah": 1, "Kadang-kadang": 2, "Selalu": 3}
-    ncp_mapping = {'Antara 1 atau 2': 1, 'Tiga': 2, 'Lebih dari 3': 3}
-    ch2o_mapping = {'Kurang dari satu liter': 1, 'Antara 1 dan 2 L': 2, 'Lebih dari 2 L': 3}
-    faf_mapping = {'Tidak Pernah': 0, '1 atau 2 hari': 1, '2 atau 4 hari': 2, '4 atau 5 hari': 3}
-    tue_mapping = {'0—2 jam': 0, '3—5 jam': 1, 'Lebih dari 5 jam': 2}
-
-    gender_mapping = {'Perempuan': 'Female', 'Laki-laki': 'Male'}
-    family_history_mapping = {'Ya': 'yes', 'Tidak': 'no'}
-    favc_mapping = {'Ya': 'yes', 'Tidak': 'no'}
-    caec_mapping = {'Selalu': 'Always', 'Sering': 'Frequently', 'Kadang-kadang': 'Sometimes', 'Tidak': 'no'}
-    smoke_mapping = {'Ya': 'yes', 'Tidak': 'no'}
-    scc_mapping = {'Ya': 'yes', 'Tidak': 'no'}
-    calc_mapping = {'Selalu': 'Always', 'Sering': 'Frequently', 'Kadang-kadang': 'Sometimes', 'Tidak': 'no'}
-    mtrans_mapping = {'Transportasi Umum': 'Public_Transportation', 'Jalan Kaki': 'Walking', 'Mobil Pribadi': 'Automobile', 'Sepeda Motor': 'Motorbike', 'Sepeda': 'Bike'}
+    form = {
+        'Gender': gender,
+        'Age': age,
+        'Height': height,
+        'Weight': weight,
+        'family_history_with_overweight': family_history_with_overweight,
+        'FAVC': favc,
+        'FCVC': fcvc,
+        'NCP': ncp,
+        'CAEC': caec,
+        'SMOKE': smoke,
+        'CH2O': ch2o,
+        'SCC': scc,
+        'FAF': faf,
+        'TUE': tue,
+        'CALC': calc,
+        'MTRANS': mtrans,
+    }
 
     try:
-        # Konversi teks ke numerik
-        age = int(age)
-        height = float(height) / 100.0  # cm -> meter
-        weight = float(weight)
-        bmi = weight/ (height_m ** 2)
-
-
-        # Terjemahkan label ke bahasa Inggris
-        gender_enc = gender_mapping[gender]
-        family_history_enc = family_history_mapping[family_history_with_overweight]
-        favc_enc = favc_mapping[favc]
-        caec_enc = caec_mapping[caec]
-        smoke_enc = smoke_mapping[smoke]
-        scc_enc = scc_mapping[scc]
-        calc_enc = calc_mapping[calc]
-        mtrans_enc = mtrans_mapping[mtrans]
-
-        # Label encoding dengan dict yang di-load
-        data_dict = {
-            'Gender': encoders['Gender'].transform([gender_enc])[0],
-            'Age': age,
-            'Height': height,
-            'Weight': weight,
-            'family_history_with_overweight': encoders['family_history_with_overweight'].transform([family_history_enc])[0],
-            'FAVC': encoders['FAVC'].transform([favc_enc])[0],
-            'FCVC': fcvc_mapping[fcvc],
-            'NCP': ncp_mapping[ncp],
-            'CAEC': encoders['CAEC'].transform([caec_enc])[0],
-            'SMOKE': encoders['SMOKE'].transform([smoke_enc])[0],
-            'CH2O': ch2o_mapping[ch2o],
-            'SCC': encoders['SCC'].transform([scc_enc])[0],
-            'FAF': faf_mapping[faf],
-            'TUE': tue_mapping[tue],
-            'CALC': encoders['CALC'].transform([calc_enc])[0],
-            'MTRANS': encoders['MTRANS'].transform([mtrans_enc])[0],
-            'BMI' : bmi
-        }
-
+        # Satu baris fitur numpy, siap diprediksi
+        with PROFILER.stage('app.preprocess'):
+            return encoder.encode(form)
     except Exception as e:
         st.error(f"Error saat preprocessing input: {e}")
         return None
 
-    # Buat dataframe satu baris untuk diprediksi
-    df = pd.DataFrame([data_dict])
-    return df
-
 try:
     load_css('static/css/styles.css') # Load CSS
 except:
     pass
 
-# Muat model dan encoders
-model = load_model()
-label_encoders = load_label_encoders()
+# Model dimuat di background; halaman statis tidak menunggunya
+start_warm_up()
 
 # ======================== NAVIGASI ========================
 with st.sidebar:
@@ -172,13 +304,20 @@ with st.sidebar:
     # Tambahkan opsi menu
     page = option_menu(
         "   ",  # Judul menu
-        ["Meet Your Buddy", "Buddy Scan", "Buddy Insights"],  # Opsi menu
-        icons=["info-circle", "clipboard-data", "bar-chart-line"],  # Ikon opsi menu
+        ["Meet Your Buddy", "Buddy Scan", "Buddy Batch", "Buddy Insights"],  # Opsi menu
+        icons=["info-circle", "clipboard-data", "file-earmark-spreadsheet", "bar-chart-line"],  # Ikon opsi menu
         menu_icon="list",  # Ikon menu utama (hamburger menu)
         default_index=0,  # Indeks default yang dipilih
         orientation="vertical",  # Sidebar vertikal
     )
 
+    # Laporan profiling, hanya muncul jika OBESITY_PROFILE diset
+    if PROFILER.enabled:
+        with st.expander("⏱️ Profiling"):
+            st.json({'profiling': PROFILER.report(), 'prediction_cache': get_prediction_cache().stats()})
+            if st.button("Reset profiling"):
+                PROFILER.reset()
+
 # ======================== HALAMAN: MEET YOUR BUDDY ========================
 if page == "Meet Your Buddy":
     st.markdown(
@@ -415,9 +554,13 @@ elif page == "Buddy Scan":
                         f"Segera konsultasikan dengan dokter atau ahli gizi untuk program yang tepat."
                     )
 
+                # Model biasanya sudah dimuat oleh warm-up; jika belum, tunggu di sini
+                with st.spinner("Memuat model..."):
+                    model, label_encoders, feature_encoder, prediction_cache, version = get_predictor()
+
                 # Lakukan preprocessing
                 input_data = preprocess_input(
-                    label_encoders,
+                    feature_encoder,
                     gender, age, height, weight,
                     family_history_with_overweight, favc, fcvc, ncp,
                     caec, smoke, ch2o, scc, faf, tue,
@@ -425,8 +568,12 @@ elif page == "Buddy Scan":
                 )
 
                 if input_data is not None and model is not None:
-                    # Prediksi
-                    prediction = model.predict(input_data)[0]
+                    # Input yang sama (setelah pembulatan) diambil dari cache tanpa menjalankan model;
+                    # hasil model versi lama tidak disimpan jika artifact sudah berganti
+                    proba, prediction, model_detail, contributions = prediction_cache.get_or_compute(
+                        input_data, lambda: predict_proba_row(model, input_data), version
+                    )
+                    confidence = proba[prediction]
                     predicted_label = label_encoders['NObeyesdad'].inverse_transform([prediction])[0]
 
                     # Tampilkan hasil prediksi dan BMI dalam card
@@ -435,14 +582,27 @@ elif page == "Buddy Scan":
                         <div style="background: linear-gradient(135deg, #f7a06a, #f74a06); padding: 20px; border-radius: 10px; box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);">
                             <h3 style="color: black;">🔎 Hasil Prediksi 🔍</h3>
                             <p style="color: white;">📈 Tingkat Obesitas Anda: <b style="color: yellow;">{predicted_label}</b></p>
+                            <p style="color: white;">🎯 Tingkat Keyakinan Model: <b style="color: yellow;">{confidence:.0%}</b> ({model_detail})</p>
                             <p style="color: white;">⚖️ BMI Anda: <b style="color: yellow;">{bmi:.2f} ({bmi_category})</b></p>
                             <p style="color: white;">📏 Berat badan normal untuk tinggi Anda: <b style="color: yellow;">{min_normal_weight:.1f} kg</b> - <b style="color: yellow;">{max_normal_weight:.1f} kg</b></p>
                             <p style="color: white;">💡 <b>Rekomendasi:</b> <span style="color: yellow;">{recommendation}</span></p>
                         </div>
-                        """.format(predicted_label=predicted_label, bmi=bmi, bmi_category=bmi_category, min_normal_weight=min_normal_weight, max_normal_weight=max_normal_weight, recommendation=recommendation),
+                        """.format(predicted_label=predicted_label, confidence=confidence, model_detail=model_detail, bmi=bmi, bmi_category=bmi_category, min_normal_weight=min_normal_weight, max_normal_weight=max_normal_weight, recommendation=recommendation),
                         unsafe_allow_html=True
                     )
 
+                    # Alasan prediksi: faktor gaya hidup dengan kontribusi terbesar ke kelas yang diprediksi
+                    if contributions is not None:
+                        answers = {
+                            'FAVC': favc, 'FCVC': fcvc, 'NCP': ncp, 'CAEC': caec, 'SMOKE': smoke, 'CH2O': ch2o,
+                            'SCC': scc, 'FAF': faf, 'TUE': tue, 'CALC': calc, 'MTRANS': mtrans,
+                        }
+                        factors = top_lifestyle_factors(contributions, prediction, feature_encoder.feature_names)
+                        if factors:
+                            st.markdown(f"**Faktor gaya hidup yang paling berpengaruh pada hasil {predicted_label}:**")
+                            for value, name in factors:
+                                st.markdown(f"- {LIFESTYLE_FACTORS[name]}: *{answers[name]}* (+{value:.0%})")
+
             except Exception as e:
                 st.error(f"Terjadi kesalahan saat prediksi: {e}")
         else:
@@ -450,6 +610,59 @@ elif page == "Buddy Scan":
 
 
 
+# ======================== HALAMAN: BUDDY BATCH ========================
+elif page == "Buddy Batch":
+    st.markdown(
+        """
+        <div style="background: linear-gradient(135deg, #f7a06a, #f74a06); padding: 20px; border-radius: 10px; box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);">
+            <h1 style="color: white; text-align: center;">Buddy Batch</h1>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+    st.write(
+        """
+        Prediksi banyak data sekaligus dari file CSV. Kolom file sama seperti dataset
+        (Gender, Age, Height, Weight, family_history_with_overweight, FAVC, FCVC, NCP, CAEC,
+        SMOKE, CH2O, SCC, FAF, TUE, CALC, MTRANS), dengan nilai seperti di dataset (Height dalam meter)
+        atau seperti pilihan di Buddy Scan (Height dalam cm). Hasil berisi satu kolom `prediction`
+        dengan urutan baris yang sama seperti file asli.
+        """
+    )
+
+    # Hasil disimpan di session state (ikut hilang saat sesi berakhir), bukan di file sementara
+    uploaded_file = st.file_uploader("Upload file CSV", type="csv")
+    result = st.session_state.get('bulk_result')
+    if result is not None and (uploaded_file is None or result['file_id'] != uploaded_file.file_id):
+        # Upload dihapus atau diganti: hasil lama tidak berlaku lagi
+        result = st.session_state['bulk_result'] = None
+
+    if uploaded_file is not None:
+        if result is None and st.button("Prediksi"):
+            with st.spinner("Memuat model..."):
+                get_predictor()
+            progress = st.progress(0.0, text="Memulai prediksi...")
+            try:
+                data, n_rows, elapsed = score_upload(uploaded_file, progress)
+            except Exception as e:
+                st.error(f"Terjadi kesalahan saat prediksi: {e}")
+            else:
+                result = st.session_state['bulk_result'] = {
+                    'file_id': uploaded_file.file_id,
+                    'data': data,
+                    'n_rows': n_rows,
+                    'elapsed': elapsed,
+                }
+
+        if result is not None:
+            st.success(
+                f"{result['n_rows']:,} baris diprediksi dalam {result['elapsed']:.1f} detik "
+                f"({result['n_rows'] / max(result['elapsed'], 1e-9):,.0f} baris/detik)"
+            )
+            st.download_button("Download hasil prediksi", result['data'], file_name=f"prediksi_{uploaded_file.name}",
+                               mime="text/csv")
+
+
 # ======================== HALAMAN: BUDDY INSIGHTS ========================
 elif page == "Buddy Insights":
     st.markdown(
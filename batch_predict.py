@@ -0,0 +1,110 @@
+import argparse
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from feature_encoder import FeatureEncoder
+from model_artifact import FEATURE_NAMES, load_artifact
+
+ARTIFACT_DIR = 'models/model_random_forest'
+
+# Diisi sekali per proses oleh _init_scorer
+_model = None
+_feature_encoder = None
+_labels = None
+
+
+def _init_scorer(artifact_dir):
+    global _model, _feature_encoder, _labels
+    model, encoders = load_artifact(artifact_dir, feature_names=FEATURE_NAMES)
+    _model = model
+    _feature_encoder = FeatureEncoder(encoders)
+    _labels = encoders['NObeyesdad'].classes_
+
+
+def score_chunk(chunk):
+    """
+    Encodes one chunk (dataset schema or form vocabulary) and returns its predicted labels.
+    """
+    _, labels = next(predict_chunks([chunk], _model, _feature_encoder, _labels))
+    return labels
+
+
+def predict_chunks(reader, model, feature_encoder, labels):
+    """
+    Scores an iterable of DataFrame chunks, yielding (chunk, predicted labels).
+
+    Chunks may be in the dataset schema or use the Buddy Scan form
+    vocabulary (Indonesian answers, Height in cm); which one is decided on
+    the first chunk and kept for the rest of the file.
+    """
+    encode = None
+    for chunk in reader:
+        if encode is None:
+            if feature_encoder.is_form_frame(chunk):
+                encode = feature_encoder.encode_form_frame
+            else:
+                encode = feature_encoder.encode_frame
+        yield chunk, labels[model.predict(encode(chunk))]
+
+
+def score_csv(input_path, output_path, artifact_dir=ARTIFACT_DIR, chunksize=50000, workers=0, verbose=True):
+    """
+    Scores a CSV with the columns of ObesityDataSet_raw_and_data_sinthetic.csv,
+    in the dataset's values or the Buddy Scan form vocabulary (see
+    predict_chunks; in a process pool every chunk is checked on its own).
+
+    The input is read chunksize rows at a time and predictions are appended
+    to output_path as each chunk finishes, in input order, so memory stays
+    flat whatever the file size. With workers > 0 chunks are scored in a
+    process pool; at most two chunks per worker are in flight at once.
+
+    Returns:
+        tuple: (rows scored, seconds elapsed).
+    """
+    start = time.perf_counter()
+    n_rows = 0
+
+    with open(output_path, 'w', newline='') as out:
+        out.write('prediction\n')
+
+        def write(labels):
+            nonlocal n_rows
+            pd.Series(labels).to_csv(out, header=False, index=False)
+            n_rows += len(labels)
+            if verbose:
+                elapsed = time.perf_counter() - start
+                print(f"{n_rows} baris ({n_rows / elapsed:,.0f} baris/detik)", file=sys.stderr)
+
+        reader = pd.read_csv(input_path, chunksize=chunksize)
+        if workers > 0:
+            with ProcessPoolExecutor(workers, initializer=_init_scorer, initargs=(artifact_dir,)) as pool:
+                pending = deque()
+                for chunk in reader:
+                    pending.append(pool.submit(score_chunk, chunk))
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+        else:
+            _init_scorer(artifact_dir)
+            for _, labels in predict_chunks(reader, _model, _feature_encoder, _labels):
+                write(labels)
+
+    return n_rows, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prediksi tingkat obesitas untuk file CSV besar secara bertahap')
+    parser.add_argument('input', help='CSV dengan kolom yang sama seperti ObesityDataSet_raw_and_data_sinthetic.csv')
+    parser.add_argument('output', help='CSV hasil prediksi (satu kolom: prediction)')
+    parser.add_argument('--artifact', default=ARTIFACT_DIR, help='direktori artifact model')
+    parser.add_argument('--chunksize', type=int, default=50000, help='jumlah baris per chunk')
+    parser.add_argument('--workers', type=int, default=0, help='jumlah proses worker (0 = tanpa pool)')
+    args = parser.parse_args()
+
+    n_rows, elapsed = score_csv(args.input, args.output, args.artifact, args.chunksize, args.workers)
+    print(f"Selesai: {n_rows} baris dalam {elapsed:.1f} detik ({n_rows / max(elapsed, 1e-9):,.0f} baris/detik)")
@@ -0,0 +1,187 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+from feature_encoder import FeatureEncoder
+from model_artifact import FEATURE_NAMES, load_artifact, save_artifact
+from model_knn import KNN
+from model_randomforest import DecisionTree, RandomForest
+from prepare_data import load_prepared
+
+# Kolom kontinu yang diberi sedikit noise saat dataset diperbesar
+CONTINUOUS_COLUMNS = ['Age', 'Height', 'Weight', 'FCVC', 'NCP', 'CH2O', 'FAF', 'TUE']
+
+SAMPLE_FORM = {
+    'Gender': 'Perempuan', 'Age': '21', 'Height': '162', 'Weight': '64',
+    'family_history_with_overweight': 'Ya', 'FAVC': 'Tidak', 'FCVC': 'Kadang-kadang', 'NCP': 'Tiga',
+    'CAEC': 'Kadang-kadang', 'SMOKE': 'Tidak', 'CH2O': 'Antara 1 dan 2 L', 'SCC': 'Tidak',
+    'FAF': 'Tidak Pernah', 'TUE': '3—5 jam', 'CALC': 'Tidak', 'MTRANS': 'Transportasi Umum',
+}
+
+
+def scale_dataset(X, y, n_rows, seed=0):
+    """
+    Resamples the dataset to n_rows, jittering the continuous columns by
+    up to 1% so the tree builders see new distinct values, and recomputes BMI.
+    """
+    rng = np.random.default_rng(seed)
+    idxs = rng.integers(0, len(X), n_rows)
+    X_big, y_big = X[idxs].copy(), y[idxs]
+    cols = [FEATURE_NAMES.index(c) for c in CONTINUOUS_COLUMNS]
+    X_big[:, cols] *= 1 + rng.uniform(-0.01, 0.01, (n_rows, len(cols)))
+    height, weight = FEATURE_NAMES.index('Height'), FEATURE_NAMES.index('Weight')
+    X_big[:, FEATURE_NAMES.index('BMI')] = np.round(X_big[:, weight] / X_big[:, height] ** 2, 2)
+    return X_big, y_big
+
+
+def measure(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(quick=False, repeats=3, n_jobs=None, seed=0):
+    """
+    Runs every benchmark and returns a list of result dicts
+    (name, params, best/median seconds, all repeats, rows per second).
+    """
+    X, y, label_encoders = load_prepared()
+    results = []
+
+    def record(name, params, fn, n_rows=None, n_repeats=repeats):
+        times = measure(fn, n_repeats)
+        best = min(times)
+        result = {
+            'name': name,
+            'params': params,
+            'best_s': best,
+            'median_s': float(np.median(times)),
+            'repeats_s': times,
+        }
+        if n_rows:
+            result['rows_per_s'] = n_rows / best
+        results.append(result)
+        print(f"{name:<28} {json.dumps(params):<45} {best * 1000:10.2f} ms", file=sys.stderr)
+
+    train_rows = 20000 if quick else 100000
+    X_train, y_train = scale_dataset(X, y, train_rows, seed)
+
+    for depth in ([5, 10] if quick else [5, 10, 20]):
+        record('decision_tree_fit', {'rows': train_rows, 'max_depth': depth},
+               lambda: DecisionTree(max_depth=depth, random_state=seed).fit(X_train, y_train))
+    record('decision_tree_fit', {'rows': train_rows, 'max_depth': 10, 'criterion': 'gini'},
+           lambda: DecisionTree(max_depth=10, random_state=seed, criterion='gini').fit(X_train, y_train))
+
+    for n_trees in ([5, 10] if quick else [10, 50, 100]):
+        for max_bins in (None, 64):
+            record('random_forest_fit', {'rows': train_rows, 'n_trees': n_trees, 'max_bins': max_bins, 'n_jobs': n_jobs},
+                   lambda: RandomForest(n_trees=n_trees, max_depth=20, max_bins=max_bins,
+                                        n_jobs=n_jobs, random_state=seed).fit(X_train, y_train),
+                   n_repeats=1)
+
+    forest = RandomForest(n_trees=20 if quick else 100, max_depth=20, n_jobs=n_jobs, random_state=seed)
+    forest.fit(X, y)
+    for n_rows in ([1, 1000, 100000] if quick else [1, 1000, 1000000]):
+        X_pred, _ = scale_dataset(X, y, n_rows, seed + 1)
+        record('random_forest_predict', {'rows': n_rows, 'n_trees': len(forest.trees)},
+               lambda: forest.predict(X_pred), n_rows=n_rows)
+
+    forest.feature_contributions(X[:1])  # tumpukan pohon dibangun sekali, seperti di app
+    for n_rows in ([1, 1000] if quick else [1, 10000]):
+        X_explain, _ = scale_dataset(X, y, n_rows, seed + 1)
+        record('random_forest_contributions', {'rows': n_rows, 'n_trees': len(forest.trees)},
+               lambda: forest.feature_contributions(X_explain), n_rows=n_rows)
+
+    feature_encoder = FeatureEncoder(label_encoders)
+    record('preprocess_input', {'requests': 1000},
+           lambda: [feature_encoder.encode(SAMPLE_FORM) for _ in range(1000)], n_rows=1000)
+
+    knn_features = [FEATURE_NAMES.index(c) for c in ['Age', 'Height', 'Weight']]
+    X_query, _ = scale_dataset(X, y, 10000, seed + 2)
+    for index in (None, 'kd_tree'):
+        knn = KNN(k=2, features=knn_features, scale=True, index=index)
+        knn.fit(X, y)
+        record('knn_predict', {'rows': len(X_query), 'index': index}, lambda: knn.predict(X_query), n_rows=len(X_query))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        joblib_path = os.path.join(tmp, 'model_random_forest.joblib')
+        artifact_dir = os.path.join(tmp, 'model_random_forest')
+        joblib.dump(forest, joblib_path)
+        save_artifact(artifact_dir, forest, label_encoders, FEATURE_NAMES)
+        record('model_load', {'format': 'joblib', 'n_trees': len(forest.trees)}, lambda: joblib.load(joblib_path))
+        record('model_load', {'format': 'artifact', 'n_trees': len(forest.trees)},
+               lambda: load_artifact(artifact_dir, feature_names=FEATURE_NAMES))
+
+    return results
+
+
+def compare(results, baseline_path, tolerance):
+    """
+    Prints the ratio against a previous results file and returns the
+    benchmarks that got slower by more than tolerance (e.g. 0.2 = 20%).
+    """
+    with open(baseline_path) as f:
+        baseline = {(r['name'], json.dumps(r['params'], sort_keys=True)): r for r in json.load(f)['results']}
+
+    regressions = []
+    for result in results:
+        key = (result['name'], json.dumps(result['params'], sort_keys=True))
+        if key not in baseline:
+            continue
+        ratio = result['best_s'] / baseline[key]['best_s']
+        flag = 'REGRESI' if ratio > 1 + tolerance else ''
+        print(f"{result['name']:<28} {key[1]:<45} x{ratio:6.2f} {flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark training dan inference (hasil dalam JSON)')
+    parser.add_argument('--output', default='benchmark_results.json', help='file JSON hasil benchmark')
+    parser.add_argument('--compare', help='file JSON hasil sebelumnya untuk dibandingkan')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='batas perlambatan sebelum dianggap regresi')
+    parser.add_argument('--quick', action='store_true', help='ukuran data dan model lebih kecil')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--n-jobs', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.quick, args.repeats, args.n_jobs, args.seed)
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'quick': args.quick,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Hasil benchmark disimpan di '{args.output}'")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from model_artifact import FEATURE_NAMES, load_artifact, save_artifact
+from model_randomforest import CompiledTree, DecisionTree, RandomForest
+from prepare_data import load_prepared
+
+ARTIFACT_DIR = 'models/model_random_forest'
+
+
+def collapse_tree(tree):
+    """
+    Turns every subtree whose leaves all predict one class into a single
+    leaf. Predictions are unchanged.
+
+    Args:
+        tree (CompiledTree): Tree to collapse.
+
+    Returns:
+        CompiledTree: New tree, nodes renumbered in preorder.
+    """
+    left, right = tree.left, tree.right
+    # leaf_value[i] is the class of a subtree that always predicts one
+    # class, else -1. Children come after their parent in preorder, so one
+    # backward pass settles every node.
+    leaf_value = np.where(left == -1, tree.value, -1)
+    for i in range(tree.n_nodes - 1, -1, -1):
+        if left[i] != -1 and leaf_value[left[i]] != -1 and leaf_value[left[i]] == leaf_value[right[i]]:
+            leaf_value[i] = leaf_value[left[i]]
+
+    records = []
+    kept = []  # old index of every new node, to carry its class distribution
+
+    def visit(i):
+        node_id = len(records)
+        kept.append(i)
+        if leaf_value[i] != -1:
+            records.append((-1, 0.0, -1, -1, leaf_value[i]))
+            return node_id
+        records.append(None)
+        new_left = visit(left[i])
+        new_right = visit(right[i])
+        records[node_id] = (tree.feature[i], tree.threshold[i], new_left, new_right, -1)
+        return node_id
+
+    visit(0)
+    distribution = None if tree.distribution is None else tree.distribution[kept]
+    return CompiledTree.from_records(records, distribution)
+
+
+def _small_int(array):
+    return array.astype(np.result_type(np.min_scalar_type(array.min()), np.min_scalar_type(array.max()), np.int8))
+
+
+def quantize_tree(tree):
+    """
+    Stores thresholds and node class distributions as float32, and node,
+    feature and class indices in the smallest integer type that holds them.
+
+    Thresholds are rounded up to the next float32, so a value equal to a
+    training threshold still goes left; only inputs within one float32 step
+    above a threshold can change sides.
+    """
+    threshold = tree.threshold.astype(np.float32)
+    below = threshold < tree.threshold
+    threshold[below] = np.nextafter(threshold[below], np.float32(np.inf))
+    distribution = None if tree.distribution is None else tree.distribution.astype(np.float32)
+    return CompiledTree(_small_int(tree.feature), threshold, _small_int(tree.left), _small_int(tree.right),
+                        _small_int(tree.value), distribution)
+
+
+def select_trees(forest, X_val, y_val, tolerance, min_trees=25):
+    """
+    Greedily picks a small subset of trees whose majority vote stays within
+    tolerance of the full forest's validation accuracy.
+
+    Trees are added one at a time, each time the one that raises the
+    subset's validation accuracy most, until the target is reached and at
+    least min_trees are kept; with a small validation set a handful of
+    trees can match it by chance and generalize worse.
+
+    Returns:
+        list: Indices of the selected trees, in forest order.
+    """
+    n_classes = forest._n_classes()
+    tree_preds = forest._tree_predictions(X_val)
+    target = np.mean(forest.predict(X_val) == y_val) - tolerance
+
+    # Every candidate's vote as a (trees, rows, classes) one-hot block
+    onehot = np.eye(n_classes, dtype=np.int32)[tree_preds]
+    votes = np.zeros((len(y_val), n_classes), dtype=np.int32)
+    # first[row, class]: forest index of the earliest selected tree voting
+    # class on row. The subset keeps forest order, so a tie goes to the
+    # tied class with the smallest one, as in RandomForest._majority_vote.
+    n_trees = len(forest.trees)
+    first = np.full((len(y_val), n_classes), n_trees)
+    remaining = list(range(n_trees))
+    selected = []
+    while remaining:
+        candidate_votes = votes + onehot[remaining]
+        candidate_first = np.where(onehot[remaining] == 1,
+                                   np.minimum(first, np.array(remaining)[:, None, None]), first)
+        tied = candidate_votes == candidate_votes.max(axis=2, keepdims=True)
+        winners = np.argmin(np.where(tied, candidate_first, n_trees), axis=2)
+        accuracies = np.mean(winners == y_val, axis=1)
+        best = int(np.argmax(accuracies))
+        selected.append(remaining.pop(best))
+        votes = candidate_votes[best]
+        first = candidate_first[best]
+        if accuracies[best] >= target and len(selected) >= min_trees:
+            break
+    return sorted(selected)
+
+
+def _forest_with(forest, trees):
+    compressed = RandomForest(n_trees=len(trees), max_depth=forest.max_depth,
+                              min_samples_split=forest.min_samples_split, n_feature=forest.n_features,
+                              max_bins=forest.max_bins, random_state=forest.random_state,
+                              criterion=forest.criterion)
+    for compiled in trees:
+        tree = DecisionTree(max_depth=forest.max_depth, min_samples_split=forest.min_samples_split,
+                            n_features=forest.n_features)
+        tree.tree = compiled
+        compressed.trees.append(tree)
+    return compressed
+
+
+def _single_row_ms(predict_row, X_test, n_single=200):
+    start = time.perf_counter()
+    for i in range(n_single):
+        predict_row(X_test[i % len(X_test):i % len(X_test) + 1])
+    return (time.perf_counter() - start) / n_single * 1000
+
+
+def _measure(forest, X_val, y_val, X_test, y_test, label_encoders):
+    forest.predict(X_test)  # pemanasan (halaman mmap, cache)
+    # Seperti app.py: explain (semua pohon + kontribusi fitur) jika pohon menyimpan distribusi kelas,
+    # selain itu pohon dievaluasi per 25 dengan early exit; keduanya dilaporkan
+    early_exit_ms = _single_row_ms(lambda row: forest.predict_proba(row, chunk_size=25), X_test)
+    explain_ms = None
+    if all(tree.tree.distribution is not None for tree in forest.trees):
+        forest.explain(X_test[:1])  # pemanasan (salinan pohon bertumpuk)
+        explain_ms = _single_row_ms(forest.explain, X_test)
+
+    X_batch = np.resize(X_test, (100000, X_test.shape[1]))
+    start = time.perf_counter()
+    forest.predict(X_batch)
+    rows_per_s = len(X_batch) / (time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        save_artifact(tmp, forest, label_encoders, FEATURE_NAMES)
+        artifact_bytes = sum(os.path.getsize(os.path.join(root, name))
+                             for root, _, names in os.walk(tmp) for name in names)
+
+    return {
+        'n_trees': len(forest.trees),
+        'n_nodes': sum(tree.tree.n_nodes for tree in forest.trees),
+        'tree_bytes': sum(tree.tree.nbytes for tree in forest.trees),
+        'artifact_bytes': artifact_bytes,
+        'single_row_ms': early_exit_ms if explain_ms is None else explain_ms,
+        'single_row_explain_ms': explain_ms,
+        'single_row_early_exit_ms': early_exit_ms,
+        'batch_rows_per_s': rows_per_s,
+        'val_accuracy': float(np.mean(forest.predict(X_val) == y_val)),
+        'test_accuracy': float(np.mean(forest.predict(X_test) == y_test)),
+    }
+
+
+def compress(forest, X_val, y_val, tolerance=0.005, quantize=True, min_trees=25):
+    """
+    Collapses same-class subtrees, optionally quantizes, then keeps the
+    subset of trees chosen by select_trees.
+
+    Returns:
+        tuple: (compressed RandomForest, list of (stage, forest) pairs for reporting).
+    """
+    stages = [('asli', forest)]
+    trees = [collapse_tree(tree.tree) for tree in forest.trees]
+    stages.append(('collapse', _forest_with(forest, trees)))
+    if quantize:
+        trees = [quantize_tree(tree) for tree in trees]
+        stages.append(('float32', _forest_with(forest, trees)))
+    selected = select_trees(stages[-1][1], X_val, y_val, tolerance, min_trees)
+    compressed = _forest_with(forest, [trees[i] for i in selected])
+    stages.append(('subset', compressed))
+    return compressed, stages
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Kompres model Random Forest untuk serving')
+    parser.add_argument('--artifact', default=ARTIFACT_DIR, help='direktori artifact model asal')
+    parser.add_argument('--output', default='models/model_random_forest_small', help='direktori artifact hasil')
+    parser.add_argument('--tolerance', type=float, default=0.005,
+                        help='penurunan akurasi validasi maksimum saat memilih subset pohon')
+    parser.add_argument('--min-trees', type=int, default=25, help='jumlah pohon minimum pada subset')
+    parser.add_argument('--no-quantize', action='store_true', help='threshold tetap float64')
+    parser.add_argument('--report', help='simpan laporan trade-off ke file JSON')
+    args = parser.parse_args()
+
+    forest, label_encoders = load_artifact(args.artifact, feature_names=FEATURE_NAMES)
+    X, y, _ = load_prepared()
+    # Baris uji train_model.py (tidak dipakai saat training), dibagi dua: validasi untuk memilih pohon, uji untuk laporan
+    _, X_holdout, _, y_holdout = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_val, X_test, y_val, y_test = train_test_split(X_holdout, y_holdout, test_size=0.5, random_state=0)
+
+    compressed, stages = compress(forest, X_val, y_val, args.tolerance, quantize=not args.no_quantize,
+                                  min_trees=args.min_trees)
+    report = {name: _measure(stage, X_val, y_val, X_test, y_test, label_encoders) for name, stage in stages}
+
+    # '1 baris' adalah jalur yang dipakai app.py; 'early exit' hanya predict_proba per 25 pohon
+    print(f"{'tahap':<10} {'pohon':>6} {'node':>8} {'ukuran':>10} {'1 baris':>9} {'early exit':>10} "
+          f"{'baris/detik':>12} {'val':>7} {'uji':>7}")
+    for name, row in report.items():
+        print(f"{name:<10} {row['n_trees']:>6} {row['n_nodes']:>8} {row['artifact_bytes'] / 1024:>8.0f}KB "
+              f"{row['single_row_ms']:>7.2f}ms {row['single_row_early_exit_ms']:>8.2f}ms "
+              f"{row['batch_rows_per_s']:>12,.0f} "
+              f"{row['val_accuracy']:>7.4f} {row['test_accuracy']:>7.4f}")
+
+    save_artifact(args.output, compressed, label_encoders, FEATURE_NAMES)
+    print(f"Model terkompresi disimpan di '{args.output}' (pakai dengan OBESITY_MODEL_DIR={args.output})")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Laporan disimpan di '{args.report}'")
@@ -0,0 +1,178 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from model_artifact import FEATURE_NAMES
+
+# Jawaban form (Bahasa Indonesia) -> nilai kategori di dataset, lalu di-encode dengan LabelEncoder
+CATEGORICAL_FORM_VALUES = {
+    'Gender': {'Perempuan': 'Female', 'Laki-laki': 'Male'},
+    'family_history_with_overweight': {'Ya': 'yes', 'Tidak': 'no'},
+    'FAVC': {'Ya': 'yes', 'Tidak': 'no'},
+    'CAEC': {'Selalu': 'Always', 'Sering': 'Frequently', 'Kadang-kadang': 'Sometimes', 'Tidak': 'no'},
+    'SMOKE': {'Ya': 'yes', 'Tidak': 'no'},
+    'SCC': {'Ya': 'yes', 'Tidak': 'no'},
+    'CALC': {'Selalu': 'Always', 'Sering': 'Frequently', 'Kadang-kadang': 'Sometimes', 'Tidak': 'no'},
+    'MTRANS': {'Transportasi Umum': 'Public_Transportation', 'Jalan Kaki': 'Walking',
+               'Mobil Pribadi': 'Automobile', 'Sepeda Motor': 'Motorbike', 'Sepeda': 'Bike'},
+}
+
+# Jawaban form -> nilai numerik langsung
+ORDINAL_FORM_VALUES = {
+    'FCVC': {'Tidak Pernah': 1, 'Kadang-kadang': 2, 'Selalu': 3},
+    'NCP': {'Antara 1 atau 2': 1, 'Tiga': 2, 'Lebih dari 3': 3},
+    'CH2O': {'Kurang dari satu liter': 1, 'Antara 1 dan 2 L': 2, 'Lebih dari 2 L': 3},
+    'FAF': {'Tidak Pernah': 0, '1 atau 2 hari': 1, '2 atau 4 hari': 2, '4 atau 5 hari': 3},
+    'TUE': {'0—2 jam': 0, '3—5 jam': 1, 'Lebih dari 5 jam': 2},
+}
+
+
+def _check_body(height, weight):
+    # Height (m) and weight (kg) must be finite and positive, or BMI is undefined
+    for name, values in (('Height', height), ('Weight', weight)):
+        if not np.all(np.isfinite(values) & (np.asarray(values) > 0)):
+            raise ValueError(f"{name} must be a finite positive number")
+
+
+class FeatureEncoder:
+    """
+    Encodes Buddy Scan form answers into model feature rows.
+
+    The label encoders are read once: every categorical and ordinal field
+    becomes a flat dict from the Indonesian form value straight to its
+    numeric code, so encoding a request is a handful of dict lookups
+    written into a NumPy row, with no sklearn or pandas calls.
+
+    Form dicts are keyed by feature name; Age, Height (cm) and Weight (kg)
+    may be strings. BMI is derived the way train_model.py does it.
+
+    encode_frame handles whole DataFrames in the dataset schema instead
+    (English category values, Height in metres), one column at a time;
+    encode_form_frame does the same for DataFrames of form answers.
+    """
+    def __init__(self, label_encoders, feature_names=FEATURE_NAMES):
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+
+        # Kelas tiap kolom kategori, sesuai urutan kode LabelEncoder
+        self.classes = {col: list(label_encoders[col].classes_) for col in CATEGORICAL_FORM_VALUES}
+
+        self.lookup = {}
+        for col, mapping in CATEGORICAL_FORM_VALUES.items():
+            codes = {value: code for code, value in enumerate(self.classes[col])}
+            self.lookup[col] = {answer: codes[value] for answer, value in mapping.items()}
+        for col, mapping in ORDINAL_FORM_VALUES.items():
+            self.lookup[col] = dict(mapping)
+
+        # (position, lookup table) pairs in column order, resolved once
+        self._lookups = [(self.feature_names.index(col), table) for col, table in self.lookup.items()]
+        self._age = self.feature_names.index('Age')
+        self._height = self.feature_names.index('Height')
+        self._weight = self.feature_names.index('Weight')
+        self._bmi = self.feature_names.index('BMI')
+
+    def encode(self, form, out=None):
+        """
+        Encodes one form into a (1, n_features) row.
+
+        Args:
+            form (dict): Feature name -> form answer.
+            out (numpy.ndarray): Optional preallocated row to write into.
+
+        Returns:
+            numpy.ndarray: The encoded row (out, if given).
+
+        Raises:
+            KeyError: An answer outside the form vocabulary.
+            ValueError: Age, height or weight is not a number, or height or
+                weight is not finite and positive.
+        """
+        if out is None:
+            out = np.empty((1, self.n_features))
+        row = out.reshape(-1)
+
+        for i, table in self._lookups:
+            row[i] = table[form[self.feature_names[i]]]
+
+        height = float(form['Height']) / 100.0  # cm -> meter
+        weight = float(form['Weight'])
+        # Plain float checks: a NumPy call here would double the cost of encoding one form
+        if not (math.isfinite(height) and height > 0):
+            raise ValueError("Height must be a finite positive number")
+        if not (math.isfinite(weight) and weight > 0):
+            raise ValueError("Weight must be a finite positive number")
+        row[self._age] = int(form['Age'])
+        row[self._height] = height
+        row[self._weight] = weight
+        row[self._bmi] = np.round(weight / height ** 2, 2)
+        return out
+
+    def encode_batch(self, forms):
+        """
+        Encodes a sequence of forms into an (n_forms, n_features) matrix.
+        """
+        X = np.empty((len(forms), self.n_features))
+        for i, form in enumerate(forms):
+            self.encode(form, out=X[i])
+        return X
+
+    def encode_frame(self, df):
+        """
+        Encodes a DataFrame in the dataset schema into an (n_rows, n_features) matrix.
+
+        Extra columns (e.g. NObeyesdad) are ignored; BMI is computed here.
+
+        Raises:
+            ValueError: A categorical column holds a value the encoders never
+                saw, or a height or weight is not finite and positive.
+        """
+        X = np.empty((len(df), self.n_features))
+        for i, name in enumerate(self.feature_names):
+            if name == 'BMI':
+                continue
+            if name in self.classes:
+                codes = pd.Categorical(df[name], categories=self.classes[name]).codes
+                if (codes < 0).any():
+                    unknown = sorted(set(df[name][codes < 0].astype(str)))
+                    raise ValueError(f"Unknown {name} values: {unknown}")
+                X[:, i] = codes
+            else:
+                X[:, i] = df[name].to_numpy(dtype=float)
+
+        _check_body(X[:, self._height], X[:, self._weight])
+        # Sama seperti train_model.py: round(Weight / Height ** 2, 2)
+        X[:, self._bmi] = np.round(X[:, self._weight] / X[:, self._height] ** 2, 2)
+        return X
+
+    def encode_form_frame(self, df):
+        """
+        Encodes a DataFrame of form answers (Indonesian vocabulary, Height
+        in cm) into an (n_rows, n_features) matrix, one lookup per column.
+
+        Raises:
+            ValueError: A column holds an answer outside the form vocabulary,
+                or a height or weight is not finite and positive.
+        """
+        X = np.empty((len(df), self.n_features))
+        for i, table in self._lookups:
+            name = self.feature_names[i]
+            codes = df[name].map(table)
+            if codes.isna().any():
+                unknown = sorted(set(df[name][codes.isna()].astype(str)))
+                raise ValueError(f"Unknown {name} values: {unknown}")
+            X[:, i] = codes.to_numpy(dtype=float)
+
+        X[:, self._age] = df['Age'].to_numpy(dtype=float).astype(int)
+        X[:, self._height] = df['Height'].to_numpy(dtype=float) / 100.0  # cm -> meter
+        X[:, self._weight] = df['Weight'].to_numpy(dtype=float)
+        _check_body(X[:, self._height], X[:, self._weight])
+        X[:, self._bmi] = np.round(X[:, self._weight] / X[:, self._height] ** 2, 2)
+        return X
+
+    def is_form_frame(self, df):
+        """
+        True when df uses the form vocabulary rather than the dataset schema,
+        judged by the Gender column.
+        """
+        return bool(df['Gender'].isin(list(self.lookup['Gender'])).all())
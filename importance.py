@@ -0,0 +1,84 @@
+import argparse
+
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.model_selection import train_test_split
+
+from model_artifact import FEATURE_NAMES, load_artifact
+from prepare_data import load_prepared
+
+ARTIFACT_DIR = 'models/model_random_forest'
+
+
+def _permuted_scores(model, X, y, columns, n_repeats, entropy):
+    # One private copy of X per task; each column is shuffled in place,
+    # scored and put back, so no other copy is made.
+    X = np.array(X, dtype=np.float64)
+    scores = np.empty((len(columns), n_repeats))
+    for i, j in enumerate(columns):
+        original = X[:, j].copy()
+        rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(j,)))
+        for r in range(n_repeats):
+            X[:, j] = original[rng.permutation(len(original))]
+            scores[i, r] = np.mean(model.predict(X) == y)
+        X[:, j] = original
+    return scores
+
+
+def permutation_importance(model, X, y, n_repeats=5, random_state=None, n_jobs=None):
+    """
+    Drop in accuracy when one feature's values are shuffled across rows.
+
+    Features are split into one group per worker. Every worker copies X
+    once and shuffles its columns in place, predicting the whole matrix
+    each time (RandomForest.predict scores it in batches). Shuffles are
+    seeded per feature, so results do not depend on n_jobs.
+
+    Args:
+        model (RandomForest or KNN): Fitted model.
+        X (numpy.ndarray): Encoded feature matrix, ideally rows not used for training.
+        y (numpy.ndarray): Encoded labels.
+        n_repeats (int): Shuffles per feature.
+        random_state (int): Seed for the shuffles.
+        n_jobs (int): joblib worker count.
+
+    Returns:
+        dict: 'baseline' accuracy, and 'importances_mean', 'importances_std'
+        and 'importances' (n_features, n_repeats) accuracy drops.
+    """
+    y = np.asarray(y)
+    baseline = np.mean(model.predict(X) == y)
+    entropy = random_state if random_state is not None else np.random.randint(np.iinfo(np.int32).max)
+
+    n_groups = min(X.shape[1], effective_n_jobs(n_jobs))
+    groups = [group for group in np.array_split(np.arange(X.shape[1]), n_groups) if len(group)]
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_permuted_scores)(model, X, y, group, n_repeats, entropy) for group in groups
+    )
+    importances = baseline - np.concatenate(scores)
+    return {
+        'baseline': float(baseline),
+        'importances_mean': importances.mean(axis=1),
+        'importances_std': importances.std(axis=1),
+        'importances': importances,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Permutation importance fitur pada data uji')
+    parser.add_argument('--artifact', default=ARTIFACT_DIR, help='direktori artifact model')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--n-jobs', type=int, default=None,
+                        help='jumlah proses; berguna untuk data uji besar (memulai pool butuh beberapa detik)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    model, _ = load_artifact(args.artifact, feature_names=FEATURE_NAMES)
+    X, y, _ = load_prepared()
+    # Baris uji yang sama seperti train_model.py
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    result = permutation_importance(model, X_test, y_test, args.repeats, args.seed, args.n_jobs)
+    print(f"Akurasi tanpa pengacakan: {result['baseline']:.4f}")
+    for j in np.argsort(-result['importances_mean']):
+        print(f"{FEATURE_NAMES[j]:<32} {result['importances_mean'][j]:.4f} ± {result['importances_std'][j]:.4f}")
@@ -0,0 +1,339 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+from sklearn.preprocessing import LabelEncoder
+
+from model_knn import KNN
+from model_randomforest import CompiledTree, DecisionTree, RandomForest
+
+FORMAT_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+
+# Urutan kolom fitur yang dipakai saat training (train_model.py)
+FEATURE_NAMES = [
+    'Gender', 'Age', 'Height', 'Weight', 'family_history_with_overweight',
+    'FAVC', 'FCVC', 'NCP', 'CAEC', 'SMOKE', 'CH2O', 'SCC', 'FAF', 'TUE',
+    'CALC', 'MTRANS', 'BMI',
+]
+
+TREE_ARRAYS = ['feature', 'threshold', 'left', 'right', 'value']
+MODEL_PARAMS = ['n_trees', 'max_depth', 'min_samples_split', 'n_features', 'max_bins', 'random_state', 'criterion']
+KNN_PARAMS = ['k', 'metric', 'p', 'features', 'scale', 'index', 'block_size']
+
+
+def _checksum(arrays):
+    digest = hashlib.sha256()
+    for name in sorted(arrays):
+        digest.update(name.encode())
+        digest.update(memoryview(np.ascontiguousarray(arrays[name])).cast('B'))
+    return digest.hexdigest()
+
+
+def _json_value(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _save_arrays(directory, arrays):
+    os.makedirs(directory, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), array)
+    return _checksum(arrays)
+
+
+def _load_arrays(directory, names, checksum, verify):
+    # np.asarray keeps the mapped pages but drops the np.memmap subclass,
+    # whose per-operation overhead dominates small predictions.
+    arrays = {name: np.asarray(np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')) for name in names}
+    if verify and _checksum(arrays) != checksum:
+        raise ValueError(f"Artifact checksum mismatch in {directory}")
+    return arrays
+
+
+def _read_manifest(path):
+    with open(os.path.join(path, 'manifest.json')) as f:
+        return json.load(f)
+
+
+def write_manifest(path, manifest):
+    """
+    Writes path/manifest.json through a temporary file and os.replace, so
+    readers see either the old or the new manifest, never a partial one.
+    """
+    tmp_path = os.path.join(path, 'manifest.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, 'manifest.json'))
+
+
+def encoders_from_classes(classes):
+    """
+    Rebuilds fitted LabelEncoders from the column name -> class list
+    mapping stored in manifests.
+    """
+    encoders = {}
+    for col, col_classes in classes.items():
+        le = LabelEncoder()
+        le.classes_ = np.array(col_classes, dtype=object)
+        encoders[col] = le
+    return encoders
+
+
+def _pack_trees(trees):
+    compiled = [tree.tree for tree in trees]
+    arrays = {name: np.concatenate([getattr(tree, name) for tree in compiled]) for name in TREE_ARRAYS}
+    arrays['tree_offsets'] = np.cumsum([0] + [tree.n_nodes for tree in compiled]).astype(np.int64)
+    if all(tree.distribution is not None for tree in compiled):
+        # Node class distributions (for explanations), padded to a common class count
+        n_classes = max(tree.distribution.shape[1] for tree in compiled)
+        arrays['distribution'] = np.concatenate([
+            np.pad(tree.distribution, ((0, 0), (0, n_classes - tree.distribution.shape[1]))) for tree in compiled
+        ])
+    return arrays
+
+
+def _unpack_trees(arrays, params):
+    trees = []
+    offsets = arrays['tree_offsets']
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        tree = DecisionTree(max_depth=params['max_depth'], min_samples_split=params['min_samples_split'],
+                            n_features=params['n_features'])
+        distribution = arrays['distribution'][start:end] if 'distribution' in arrays else None
+        tree.tree = CompiledTree(*(arrays[name][start:end] for name in TREE_ARRAYS), distribution=distribution)
+        trees.append(tree)
+    return trees
+
+
+def _forest_params(model):
+    params = {name: _json_value(getattr(model, name)) for name in MODEL_PARAMS}
+    # Seed state so warm_start / replace_trees on a loaded forest keep drawing fresh seeds
+    params['seed_entropy'] = getattr(model, '_seed_entropy', None)
+    params['next_seed'] = getattr(model, '_next_seed', len(model.trees))
+    return params
+
+
+def _pack_knn(model):
+    arrays = {'X_train': model.X_train, 'y_train': model.y_train}
+    if model.scale:
+        arrays['data_min'] = model.data_min
+        arrays['data_range'] = model.data_range
+    params = {name: _json_value(getattr(model, name)) for name in KNN_PARAMS}
+    return arrays, params
+
+
+def _unpack_knn(arrays, params):
+    model = KNN(**params)
+    model.X_train = arrays['X_train']
+    model.y_train = arrays['y_train']
+    model.n_classes = int(model.y_train.max()) + 1
+    model.data_min = arrays.get('data_min')
+    model.data_range = arrays.get('data_range')
+    model._build_index()
+    return model
+
+
+def save_artifact(path, model, label_encoders, feature_names):
+    """
+    Saves a fitted model and its label encoders as one artifact directory.
+
+    A RandomForest is stored as segments: each segment directory holds the
+    concatenated arrays of a run of trees, with tree_offsets marking where
+    each tree starts (child indices stay local to their tree) and, when the
+    trees recorded them, their node class distributions. save_artifact
+    writes one segment; append_trees and retire_trees later add and drop
+    trees without rewriting the others. Saving over an existing forest
+    writes the new segment under a fresh name and deletes the old segments
+    only once the new manifest is in place. A KNN stores its (scaled) training
+    matrix and labels. manifest.json holds the format version, model type,
+    feature order, encoder classes, model parameters and array checksums.
+
+    Args:
+        path (str): Target directory, created if needed.
+        model (RandomForest or KNN): Fitted model.
+        label_encoders (dict): Column name -> fitted LabelEncoder.
+        feature_names (list): Column order the model was trained on.
+    """
+    os.makedirs(path, exist_ok=True)
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'feature_names': list(feature_names),
+        'encoders': {col: [_json_value(c) for c in le.classes_] for col, le in label_encoders.items()},
+    }
+
+    if isinstance(model, KNN):
+        arrays, params = _pack_knn(model)
+        manifest.update(model_type='knn', params=params, arrays=sorted(arrays),
+                        checksum=_save_arrays(path, arrays))
+    else:
+        # Numbering continues from a forest already saved here, so its
+        # segments stay intact for readers until the manifest is swapped.
+        next_segment = 0
+        if os.path.exists(os.path.join(path, 'manifest.json')):
+            next_segment = _read_manifest(path).get('next_segment', 0)
+        segment = f'trees-{next_segment:05d}'
+        arrays = _pack_trees(model.trees)
+        checksum = _save_arrays(os.path.join(path, 'segments', segment), arrays)
+        manifest.update(model_type='random_forest', params=_forest_params(model),
+                        segments=[{'name': segment, 'n_trees': len(model.trees), 'checksum': checksum,
+                                   'arrays': sorted(arrays)}],
+                        retired_trees=0, next_segment=next_segment + 1)
+
+    # Manifest terakhir ditulis. Segmen forest selalu ditulis dengan nama baru dan segmen lama baru dihapus
+    # setelah manifest diganti; load_artifact yang kehilangan segmen di antaranya membaca ulang manifest.
+    # Array KNN masih ditimpa di tempat.
+    write_manifest(path, manifest)
+
+    if manifest['model_type'] == 'random_forest':
+        for name in os.listdir(os.path.join(path, 'segments')):
+            if name != manifest['segments'][0]['name']:
+                shutil.rmtree(os.path.join(path, 'segments', name), ignore_errors=True)
+
+
+def append_trees(path, trees, model=None):
+    """
+    Adds trees to a saved forest as a new segment; existing files are untouched.
+
+    Args:
+        path (str): Forest artifact directory.
+        trees (list): Fitted DecisionTree objects, oldest first.
+        model (RandomForest): Optional forest the trees came from, to record
+            its current seed state.
+    """
+    manifest = _read_manifest(path)
+    if manifest.get('model_type', 'random_forest') != 'random_forest' or manifest['format_version'] < 2:
+        raise ValueError(f"{path} is not a segmented forest artifact; save it again with save_artifact")
+
+    segment = f"trees-{manifest['next_segment']:05d}"
+    arrays = _pack_trees(trees)
+    checksum = _save_arrays(os.path.join(path, 'segments', segment), arrays)
+    manifest['segments'].append({'name': segment, 'n_trees': len(trees), 'checksum': checksum,
+                                 'arrays': sorted(arrays)})
+    manifest['next_segment'] += 1
+    manifest['params']['n_trees'] += len(trees)
+    if model is not None:
+        manifest['params'].update(seed_entropy=model._seed_entropy, next_seed=model._next_seed)
+    write_manifest(path, manifest)
+
+
+def retire_trees(path, n_trees):
+    """
+    Drops the n_trees oldest trees from a saved forest.
+
+    Only the manifest is rewritten; segments whose trees are all retired
+    are deleted afterwards.
+    """
+    manifest = _read_manifest(path)
+    if manifest.get('model_type', 'random_forest') != 'random_forest' or manifest['format_version'] < 2:
+        raise ValueError(f"{path} is not a segmented forest artifact; save it again with save_artifact")
+    if not 0 < n_trees <= manifest['params']['n_trees']:
+        raise ValueError(f"n_trees must be between 1 and {manifest['params']['n_trees']}")
+
+    manifest['retired_trees'] += n_trees
+    manifest['params']['n_trees'] -= n_trees
+    dropped = []
+    while manifest['segments'] and manifest['retired_trees'] >= manifest['segments'][0]['n_trees']:
+        segment = manifest['segments'].pop(0)
+        manifest['retired_trees'] -= segment['n_trees']
+        dropped.append(segment['name'])
+    write_manifest(path, manifest)
+
+    for name in dropped:
+        shutil.rmtree(os.path.join(path, 'segments', name), ignore_errors=True)
+
+
+def artifact_version(path):
+    """
+    Identifies the model saved at path. save_artifact, append_trees and
+    retire_trees all rewrite manifest.json, which holds the array
+    checksums, so its hash changes whenever the saved model does.
+    """
+    with open(os.path.join(path, 'manifest.json'), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _load_model(path, manifest, verify):
+    model_type = manifest.get('model_type', 'random_forest')
+    params = manifest['params']
+    if model_type == 'knn':
+        arrays = _load_arrays(path, manifest['arrays'], manifest['checksum'], verify)
+        model = _unpack_knn(arrays, params)
+    elif model_type == 'random_forest':
+        model = RandomForest(n_trees=params['n_trees'], max_depth=params['max_depth'],
+                             min_samples_split=params['min_samples_split'], n_feature=params['n_features'],
+                             max_bins=params['max_bins'], random_state=params['random_state'],
+                             criterion=params.get('criterion', 'entropy'))
+        tree_arrays = TREE_ARRAYS + ['tree_offsets']
+        if manifest['format_version'] == 1:
+            # Versi 1: satu set array langsung di direktori artifact
+            segments = [(path, tree_arrays, manifest['checksum'])]
+        else:
+            # Segmen lama tidak mencatat daftar array (tanpa distribution)
+            segments = [(os.path.join(path, 'segments', s['name']), s.get('arrays', tree_arrays), s['checksum'])
+                        for s in manifest['segments']]
+        for directory, names, checksum in segments:
+            arrays = _load_arrays(directory, names, checksum, verify)
+            model.trees.extend(_unpack_trees(arrays, params))
+        del model.trees[:manifest.get('retired_trees', 0)]
+        if params.get('seed_entropy') is not None:
+            model._seed_entropy = params['seed_entropy']
+            model._next_seed = params['next_seed']
+    else:
+        raise ValueError(f"Unknown model type {model_type!r} in {path}")
+    return model
+
+
+def load_artifact(path, feature_names=None, verify=False):
+    """
+    Loads an artifact written by save_artifact.
+
+    Arrays are opened with np.load(mmap_mode='r'), so loading costs almost
+    nothing and processes serving the same artifact share its pages. Only
+    the format version and feature schema are checked by default; hashing
+    the arrays would read every page, so it is opt-in.
+
+    Args:
+        path (str): Artifact directory.
+        feature_names (list): Expected feature order; a mismatch raises.
+        verify (bool): Also recompute and compare the array checksums
+            (refresh_model.py does, before it rewrites the artifact).
+
+    Returns:
+        tuple: (RandomForest or KNN, dict of LabelEncoder).
+    """
+    manifest = _read_manifest(path)
+
+    if manifest['format_version'] not in SUPPORTED_VERSIONS:
+        raise ValueError(
+            f"Artifact format version {manifest['format_version']} is not supported "
+            f"(expected one of {SUPPORTED_VERSIONS})"
+        )
+    if feature_names is not None and manifest['feature_names'] != list(feature_names):
+        raise ValueError(f"Artifact features {manifest['feature_names']} do not match {list(feature_names)}")
+
+    try:
+        model = _load_model(path, manifest, verify)
+    except FileNotFoundError:
+        # Segmen lama dihapus setelah manifest baru dipasang: muat ulang dari manifest yang baru
+        if _read_manifest(path) == manifest:
+            raise
+        return load_artifact(path, feature_names, verify)
+
+    return model, encoders_from_classes(manifest['encoders'])
+
+
+if __name__ == '__main__':
+    import argparse
+    import joblib
+
+    parser = argparse.ArgumentParser(description='Konversi model .joblib ke format artifact')
+    parser.add_argument('model', help='path model_random_forest.joblib')
+    parser.add_argument('encoders', help='path label_encoders.joblib')
+    parser.add_argument('output', help='direktori artifact tujuan')
+    args = parser.parse_args()
+
+    save_artifact(args.output, joblib.load(args.model), joblib.load(args.encoders), FEATURE_NAMES)
+    print(f"Artifact berhasil disimpan di '{args.output}'")
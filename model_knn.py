@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+METRIC_P = {'euclidean': 2, 'manhattan': 1}
+
+
+class KNN:
+    """
+    K-Nearest Neighbors classifier, vectorized version of the KNN_euclidean /
+    KNN_manhattan classes in KNN_eksplorasi_training.ipynb.
+
+    Distances are computed for a block of query rows at a time against the
+    whole training set, the k nearest are picked with argpartition and the
+    vote is a bincount per row (ties go to the smallest label, like
+    scipy.stats.mode). For low-dimensional inputs index='kd_tree' or
+    'ball_tree' answers queries from a spatial index instead.
+
+    features selects the columns to use (e.g. Age, Height, Weight) and
+    scale=True min-max scales them with the training range, so the model
+    accepts the same full feature rows as the forest.
+    """
+    def __init__(self, k=3, metric='euclidean', p=2, features=None, scale=False, index=None, block_size=256):
+        if metric not in ('euclidean', 'manhattan', 'minkowski'):
+            raise ValueError(f"Unknown metric {metric!r}")
+        if index not in (None, 'kd_tree', 'ball_tree'):
+            raise ValueError(f"Unknown index {index!r}")
+        self.k = k
+        self.metric = metric
+        self.p = METRIC_P.get(metric, p)
+        self.features = features
+        self.scale = scale
+        self.index = index
+        self.block_size = block_size
+        self.X_train = None
+        self.y_train = None
+
+    def fit(self, X, y):
+        X = X.values if isinstance(X, pd.DataFrame) else np.asarray(X, dtype=float)
+        y = y.values if isinstance(y, pd.Series) else np.asarray(y)
+
+        if self.features is not None:
+            X = X[:, self.features]
+        self.data_min = X.min(axis=0) if self.scale else None
+        self.data_range = np.where(np.ptp(X, axis=0) > 0, np.ptp(X, axis=0), 1.0) if self.scale else None
+
+        self.X_train = self._transform(X)
+        self.y_train = y.astype(np.intp)
+        self.n_classes = int(self.y_train.max()) + 1
+        self._build_index()
+
+    def _transform(self, X):
+        if self.scale:
+            X = (X - self.data_min) / self.data_range
+        return np.ascontiguousarray(X, dtype=float)
+
+    def _prepare(self, X):
+        X = X.values if isinstance(X, pd.DataFrame) else np.asarray(X, dtype=float)
+        if self.features is not None:
+            X = X[:, self.features]
+        return self._transform(X)
+
+    def _build_index(self):
+        self._tree = None
+        if self.index == 'kd_tree':
+            from scipy.spatial import cKDTree
+            self._tree = cKDTree(self.X_train)
+        elif self.index == 'ball_tree':
+            from sklearn.neighbors import BallTree
+            self._tree = BallTree(self.X_train, metric='minkowski', p=self.p)
+
+    def __getstate__(self):
+        # Index dibangun ulang saat load, tidak ikut disimpan
+        state = self.__dict__.copy()
+        state.pop('_tree', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_index()
+
+    def _distances(self, X_block):
+        if self.p == 2:
+            # ||a - b||^2 = ||a||^2 + ||b||^2 - 2ab, one matrix product per block
+            sq = (X_block ** 2).sum(axis=1)[:, None] + (self.X_train ** 2).sum(axis=1) - 2 * X_block @ self.X_train.T
+            return np.sqrt(np.maximum(sq, 0))
+        diff = np.abs(X_block[:, None, :] - self.X_train[None, :, :])
+        if self.p == 1:
+            return diff.sum(axis=2)
+        return (diff ** self.p).sum(axis=2) ** (1.0 / self.p)
+
+    def kneighbors(self, X):
+        """
+        Returns (distances, indices) of the k nearest training rows, nearest first.
+        """
+        X = self._prepare(X)
+        k = min(self.k, len(self.X_train))
+
+        if self._tree is not None:
+            if self.index == 'kd_tree':
+                dist, idx = self._tree.query(X, k=k, p=self.p)
+            else:
+                dist, idx = self._tree.query(X, k=k)
+            return dist.reshape(len(X), k), idx.reshape(len(X), k)
+
+        dist = np.empty((len(X), k))
+        idx = np.empty((len(X), k), dtype=np.intp)
+        for start in range(0, len(X), self.block_size):
+            block = self._distances(X[start:start + self.block_size])
+            nearest = np.argpartition(block, k - 1, axis=1)[:, :k]
+            nearest_dist = np.take_along_axis(block, nearest, axis=1)
+            order = np.argsort(nearest_dist, axis=1, kind='stable')
+            idx[start:start + self.block_size] = np.take_along_axis(nearest, order, axis=1)
+            dist[start:start + self.block_size] = np.take_along_axis(nearest_dist, order, axis=1)
+        return dist, idx
+
+    def _votes(self, X):
+        _, idx = self.kneighbors(X)
+        labels = self.y_train[idx]
+        flat = np.arange(len(labels))[:, None] * self.n_classes + labels
+        return np.bincount(flat.ravel(), minlength=len(labels) * self.n_classes).reshape(len(labels), self.n_classes)
+
+    def predict(self, X):
+        return np.argmax(self._votes(X), axis=1)
+
+    def predict_proba(self, X):
+        votes = self._votes(X)
+        return votes / votes.sum(axis=1, keepdims=True)
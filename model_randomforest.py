@@ -1,6 +1,10 @@
+import os
+
 import numpy as np
 import pandas as pd
-from collections import Counter
+from joblib import Parallel, delayed
+
+from profiling import PROFILER
 
 class Node:
     def __init__(self, feature=None, threshold=None, left=None, right=None, *, value=None):
@@ -14,141 +18,989 @@ class Node:
         return self.value is not None
 
 
+class CompiledTree:
+    """
+    A fitted decision tree stored as parallel NumPy arrays.
+
+    Node i sends a sample to left[i] when x[feature[i]] <= threshold[i] and
+    to right[i] otherwise. Leaves have left[i] == right[i] == -1 and predict
+    value[i]. Node 0 is the root.
+
+    distribution[i], when recorded at fit time, holds the class proportions
+    of the (weighted) training samples that reached node i; it is what
+    contributions() decomposes. Trees fitted before it existed have None.
+    """
+    distribution = None
+
+    def __init__(self, feature, threshold, left, right, value, distribution=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.distribution = distribution
+
+    @classmethod
+    def from_records(cls, records, distribution=None):
+        # records: (feature, threshold, left, right, value) tuples in node order
+        feature, threshold, left, right, value = zip(*records)
+        return cls(np.array(feature, dtype=np.int32),
+                   np.array(threshold, dtype=np.float64),
+                   np.array(left, dtype=np.int32),
+                   np.array(right, dtype=np.int32),
+                   np.array(value, dtype=np.int32),
+                   distribution)
+
+    @classmethod
+    def from_node(cls, root):
+        """
+        Converts a linked Node tree (models pickled before CompiledTree existed).
+        """
+        records = []
+
+        def visit(node):
+            node_id = len(records)
+            if node.is_leaf_node():
+                records.append((-1, 0.0, -1, -1, node.value))
+                return node_id
+            records.append(None)
+            left = visit(node.left)
+            right = visit(node.right)
+            records[node_id] = (node.feature, node.threshold, left, right, -1)
+            return node_id
+
+        visit(root)
+        return cls.from_records(records)
+
+    def apply(self, X):
+        """
+        Returns the leaf index reached by every row of X.
+
+        All rows move down the tree together, one level per iteration, so the
+        Python work grows with the depth of the tree and not with len(X).
+        """
+        node = np.zeros(len(X), dtype=np.intp)
+        active = np.arange(len(X))
+        while len(active):
+            current = node[active]
+            is_split = self.left[current] != -1
+            active, current = active[is_split], current[is_split]
+            go_left = X[active, self.feature[current]] <= self.threshold[current]
+            node[active] = np.where(go_left, self.left[current], self.right[current])
+        return node
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def n_leaves(self):
+        return int(np.count_nonzero(self.left == -1))
+
+    @property
+    def depth(self):
+        # Walk the levels like apply(): frontier holds the nodes at one depth.
+        depth, frontier = 0, np.array([0])
+        while True:
+            frontier = frontier[self.left[frontier] != -1]
+            if not len(frontier):
+                return depth
+            frontier = np.concatenate([self.left[frontier], self.right[frontier]])
+            depth += 1
+
+    def contributions(self, X):
+        """
+        Saabas decomposition of the class distribution predicted for X.
+
+        Every split on a row's path moves the distribution from the parent's
+        to the child's; that change is credited to the split feature. The
+        root distribution (bias) plus the per-feature contributions equals
+        the leaf distribution.
+
+        Returns:
+            tuple: (bias of shape (n_classes,), contributions of shape
+            (n_rows, n_features, n_classes)).
+        """
+        if self.distribution is None:
+            raise AttributeError("contributions needs a tree fitted with node class distributions")
+        bias, contributions, _ = _path_contributions(X, self.feature, self.threshold, self.left, self.right,
+                                                     self.distribution, np.zeros(1, dtype=np.intp))
+        return bias, contributions
+
+    @property
+    def nbytes(self):
+        arrays = [self.feature, self.threshold, self.left, self.right, self.value]
+        if self.distribution is not None:
+            arrays.append(self.distribution)
+        return sum(a.nbytes for a in arrays)
+
+
+def _path_contributions(X, feature, threshold, left, right, distribution, roots):
+    # Walks every (root, row) pair down its tree together, one level per
+    # iteration like CompiledTree.apply, adding child - parent distribution
+    # to (row, split feature). roots index into the same node arrays, so a
+    # whole forest stacked into one set of arrays is a single traversal.
+    # Also returns the leaf reached by every pair, root-major.
+    n_rows, n_features = X.shape
+    n_classes = distribution.shape[1]
+    rows = np.tile(np.arange(n_rows), len(roots))
+    node = np.repeat(roots, n_rows)
+    flat = np.zeros((n_rows * n_features, n_classes))
+    active = np.arange(len(node))
+    while len(active):
+        current = node[active]
+        is_split = left[current] != -1
+        active, current = active[is_split], current[is_split]
+        row, feat = rows[active], feature[current]
+        next_node = np.where(X[row, feat] <= threshold[current], left[current], right[current])
+        # One bincount over (row, feature, class) triples accumulates the
+        # changes of every tree reaching this depth.
+        cells = (row * n_features + feat)[:, None] * n_classes + np.arange(n_classes)
+        flat += np.bincount(cells.ravel(), weights=(distribution[next_node] - distribution[current]).ravel(),
+                            minlength=flat.size).reshape(flat.shape)
+        node[active] = next_node
+    bias = distribution[roots].mean(axis=0, dtype=np.float64)
+    return bias, flat.reshape(n_rows, n_features, n_classes) / len(roots), node
+
+
+def compute_bin_edges(X, max_bins=255):
+    """
+    Picks at most max_bins - 1 split points per feature.
+
+    Features with few distinct values keep all of them, so binning is
+    lossless for the categorical columns; continuous ones are cut at
+    quantiles. Edges are actual data values, which means a split at bin b
+    is the same as the raw threshold X <= edges[b].
+
+    Args:
+        X (numpy.ndarray): Feature matrix.
+        max_bins (int): Number of bins per feature, between 2 and 256.
+
+    Returns:
+        list: One sorted edge array per feature.
+    """
+    if not 2 <= max_bins <= 256:
+        raise ValueError("max_bins must be between 2 and 256")
+    bin_edges = []
+    for col in np.asarray(X, dtype=float).T:
+        uniq = np.unique(col)
+        if len(uniq) <= max_bins:
+            edges = uniq[:-1]
+        else:
+            qs = np.linspace(0, 1, max_bins + 1)[1:-1]
+            edges = np.unique(np.quantile(col, qs, method='lower'))
+        bin_edges.append(edges)
+    return bin_edges
+
+
+def apply_bins(X, bin_edges):
+    """
+    Quantizes X into uint8 bin codes using edges from compute_bin_edges.
+    """
+    X = np.asarray(X, dtype=float)
+    X_binned = np.empty(X.shape, dtype=np.uint8)
+    for j, edges in enumerate(bin_edges):
+        X_binned[:, j] = np.searchsorted(edges, X[:, j], side='left')
+    return X_binned
+
+
+def class_metrics(y_true, y_pred, n_classes):
+    """
+    Per-class precision, recall, F1 and support from one confusion matrix.
+
+    Returns:
+        dict: Class label -> {'precision', 'recall', 'f1-score', 'support'}.
+    """
+    confusion = np.bincount(y_true * n_classes + y_pred, minlength=n_classes * n_classes)
+    confusion = confusion.reshape(n_classes, n_classes)
+    true_pos = np.diag(confusion)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        precision = np.nan_to_num(true_pos / confusion.sum(axis=0))
+        recall = np.nan_to_num(true_pos / confusion.sum(axis=1))
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+    return {
+        c: {'precision': precision[c], 'recall': recall[c], 'f1-score': f1[c], 'support': int(confusion[c].sum())}
+        for c in range(n_classes)
+    }
+
+
+def _proportions(counts, n):
+    # Empty sides (n == 0) have all-zero counts and get proportions of 0.
+    n = np.asarray(n)
+    return counts / np.where(n > 0, n, 1)[..., None]
+
+
+def entropy(counts, n):
+    """
+    Entropy of every class-count vector in counts.
+
+    Args:
+        counts (numpy.ndarray): Class counts (or summed sample weights) on
+            the last axis; any leading axes index candidate splits.
+        n (numpy.ndarray or scalar): Totals matching counts.shape[:-1].
+
+    Returns:
+        numpy.ndarray: Impurity per count vector.
+    """
+    ps = _proportions(counts, n)
+    log_ps = np.log(ps, out=np.zeros_like(ps), where=ps > 0)
+    return -np.sum(ps * log_ps, axis=-1)
+
+
+def gini(counts, n):
+    """
+    Gini impurity 1 - sum(p^2); same arguments as entropy but without the log.
+    """
+    ps = _proportions(counts, n)
+    return 1.0 - np.sum(ps * ps, axis=-1)
+
+
+CRITERIA = {'entropy': entropy, 'gini': gini}
+
+# Class-count cells (rows x features x classes) one block of the exact split
+# search may hold; bounds its memory to a few times this many values.
+SPLIT_BLOCK_CELLS = 1 << 20
+
+
+def _check_criterion(criterion):
+    if criterion not in CRITERIA:
+        raise ValueError(f"criterion must be one of {sorted(CRITERIA)}, got {criterion!r}")
+
+
+def _check_sample_weight(sample_weight, n_samples):
+    if sample_weight is None:
+        return None
+    sample_weight = np.asarray(sample_weight, dtype=np.float64)
+    if sample_weight.shape != (n_samples,):
+        raise ValueError(f"sample_weight must have shape ({n_samples},), got {sample_weight.shape}")
+    if (sample_weight < 0).any():
+        raise ValueError("sample_weight must not be negative")
+    return sample_weight
+
+
 class DecisionTree:
-    def __init__(self, min_samples_split=2, max_depth=100, n_features=None):
+    def __init__(self, min_samples_split=2, max_depth=100, n_features=None, max_bins=None, random_state=None,
+                 criterion='entropy'):
         self.min_samples_split = min_samples_split
         self.max_depth = max_depth
         self.n_features = n_features
-        self.root = None
-
-    def fit(self, X, y):
+        self.max_bins = max_bins
+        self.random_state = random_state
+        self.criterion = criterion
+        self.tree = None
+
+    def __setstate__(self, state):
+        # Models pickled before CompiledTree kept a linked Node graph in root.
+        root = state.pop('root', None)
+        if root is not None and state.get('tree') is None:
+            state['tree'] = CompiledTree.from_node(root)
+        self.__dict__.update(max_bins=None, random_state=None, criterion='entropy')
+        self.__dict__.update(state)
+
+    def fit(self, X, y, sample_weight=None):
         if isinstance(X, pd.DataFrame):  # Check if X is a DataFrame
             X = X.values  # Convert DataFrame to numpy array
         if isinstance(y, pd.Series):  # Check if y is a Series
             y = y.values  # Convert Series to numpy array
-
+        _check_criterion(self.criterion)
+        sample_weight = _check_sample_weight(sample_weight, len(y))
+
+        # Without a random_state the global numpy RNG is used, as before.
+        rng = np.random if self.random_state is None else np.random.default_rng(self.random_state)
+        if self.max_bins:
+            bin_edges = compute_bin_edges(X, self.max_bins)
+            self._fit_binned(apply_bins(X, bin_edges), y, bin_edges, rng, sample_weight)
+        else:
+            self._fit_exact(X, y, rng, sample_weight)
+
+    # Both builders read X in place and pass index arrays down the tree; no
+    # node copies its rows. rows restricts the fit to a subset of X, and
+    # row_counts[i] says how many times row i counts towards
+    # min_samples_split (a bootstrap draws rows more than once).
+    def _fit_exact(self, X, y, rng, sample_weight=None, rows=None, row_counts=None):
         self.n_features = X.shape[1] if not self.n_features else min(X.shape[1], self.n_features)
-        self.root = self._grow_tree(X, y)
-
-    def _grow_tree(self, X, y, depth=0):
-        n_samples, n_feats = X.shape
-        n_labels = len(np.unique(y))
-
-        if (depth >= self.max_depth or n_labels == 1 or n_samples < self.min_samples_split):
-            leaf_value = self._most_common_label(y)
-            return Node(value=leaf_value)
-
-        feat_idxs = np.random.choice(n_feats, self.n_features, replace=False)
-
-        best_feature, best_thresh = self._best_split(X, y, feat_idxs)
-
-        left_idxs, right_idxs = self._split(X[:, best_feature], best_thresh)
-        left = self._grow_tree(X[left_idxs, :], y[left_idxs], depth + 1)
-        right = self._grow_tree(X[right_idxs, :], y[right_idxs], depth + 1)
-        return Node(best_feature, best_thresh, left, right)
-
-    def _best_split(self, X, y, feat_idxs):
-        best_gain = -1
-        split_idx, split_threshold = None, None
-
-        for feat_idx in feat_idxs:
-            X_column = X[:, feat_idx]
-            thresholds = np.unique(X_column)
-
-            for thr in thresholds:
-                gain = self._information_gain(y, X_column, thr)
-
-                if gain > best_gain:
-                    best_gain = gain
-                    split_idx = feat_idx
-                    split_threshold = thr
-
-        return split_idx, split_threshold
-
-    def _information_gain(self, y, X_column, threshold):
-        parent_entropy = self._entropy(y)
-        left_idxs, right_idxs = self._split(X_column, threshold)
-
-        if len(left_idxs) == 0 or len(right_idxs) == 0:
-            return 0
-
-        n = len(y)
-        n_l, n_r = len(left_idxs), len(right_idxs)
-        e_l, e_r = self._entropy(y[left_idxs]), self._entropy(y[right_idxs])
-        child_entropy = (n_l/n) * e_l + (n_r/n) * e_r
-
-        information_gain = parent_entropy - child_entropy
-        return information_gain
-
-    def _split(self, X_column, split_thresh):
-        left_idxs = np.argwhere(X_column <= split_thresh).flatten()
-        right_idxs = np.argwhere(X_column > split_thresh).flatten()
-        return left_idxs, right_idxs
-
-    def _entropy(self, y):
-        hist = np.bincount(y)
-        ps = hist / len(y)
-        return -np.sum([p * np.log(p) for p in ps if p > 0])
-
-    def _most_common_label(self, y):
-        counter = Counter(y)
-        value = counter.most_common(1)[0][0]
-        return value
+        self._start_fit(X.shape[1], y.max() + 1, rng, sample_weight, row_counts)
+        with PROFILER.stage('tree.fit'):
+            self._grow_tree(X, y, np.arange(len(y)) if rows is None else rows)
+            self.tree = CompiledTree.from_records(self._records, self._node_distributions())
+        self._end_fit()
+
+    def _fit_binned(self, X_binned, y, bin_edges, rng, sample_weight=None, rows=None, row_counts=None):
+        # Histogram mode: X_binned holds uint8 codes from apply_bins and every
+        # node keeps a (features, bins, classes) count histogram, summing
+        # sample weights instead of counting rows when they are given.
+        self.n_features = X_binned.shape[1] if not self.n_features else min(X_binned.shape[1], self.n_features)
+        self._start_fit(X_binned.shape[1], y.max() + 1, rng, sample_weight, row_counts)
+        self._bin_edges = bin_edges
+        self._n_bins = max(len(edges) for edges in bin_edges) + 1
+        idxs = np.arange(len(y)) if rows is None else rows
+        with PROFILER.stage('tree.fit'):
+            hist = self._histogram(X_binned, y, idxs)
+            self._grow_tree_binned(X_binned, y, idxs, hist)
+            self.tree = CompiledTree.from_records(self._records, self._node_distributions())
+        del self._bin_edges, self._n_bins
+        self._end_fit()
+
+    def _start_fit(self, n_columns, n_classes, rng, sample_weight, row_counts):
+        self._rng = rng
+        self._records = []
+        # Weighted class counts per node, in the same order as _records
+        self._class_counts = []
+        self._n_classes = n_classes
+        self._impurity = CRITERIA[self.criterion]
+        self._sample_weight = sample_weight
+        self._row_counts = row_counts
+        self._importances = np.zeros(n_columns)
+
+    def _end_fit(self):
+        # Mean decrease in impurity: every split adds its weighted impurity
+        # decrease (found by the split search anyway) to its feature.
+        total = self._importances.sum()
+        self.feature_importances_ = self._importances / total if total > 0 else self._importances
+        del self._rng, self._records, self._class_counts, self._n_classes
+        del self._impurity, self._sample_weight, self._row_counts, self._importances
+        self._record_stats()
+
+    def _record_stats(self):
+        if PROFILER.enabled:
+            PROFILER.record_tree(self.tree.n_nodes, self.tree.n_leaves, self.tree.depth)
+
+    def _add_leaf(self, y, counts, sample_weight=None):
+        self._records.append((-1, 0.0, -1, -1, self._most_common_label(y, sample_weight)))
+        self._class_counts.append(counts)
+        return len(self._records) - 1
+
+    def _add_split(self, counts):
+        # Reserve the parent's slot first so nodes are numbered in preorder.
+        self._records.append(None)
+        self._class_counts.append(counts)
+        return len(self._records) - 1
+
+    def _node_distributions(self):
+        # float32 is plenty for explanations and halves the stored size
+        counts = np.array(self._class_counts, dtype=np.float64)
+        return _proportions(counts, counts.sum(axis=1)).astype(np.float32)
+
+    def _grow_tree(self, X, y, idxs, depth=0):
+        n_samples = self._node_size(idxs)
+        y_node = y[idxs]
+        counts = np.bincount(y_node, weights=self._node_weight(idxs), minlength=self._n_classes)
+        n_labels = np.count_nonzero(np.bincount(y_node))
+
+        # A node whose samples all have zero weight has no impurity to reduce.
+        if (depth >= self.max_depth or n_labels == 1 or n_samples < self.min_samples_split
+                or counts.sum() == 0):
+            return self._add_leaf(y_node, counts, self._node_weight(idxs))
+
+        feat_idxs = self._rng.choice(X.shape[1], self.n_features, replace=False)
+
+        with PROFILER.stage('tree.best_split'):
+            best_feature, best_thresh, decrease = self._best_split(X, idxs, y_node, feat_idxs,
+                                                                   self._node_weight(idxs))
+        if best_feature is None:  # no threshold separates the samples
+            return self._add_leaf(y_node, counts, self._node_weight(idxs))
+        self._importances[best_feature] += decrease
+
+        node_id = self._add_split(counts)
+        go_left = X[idxs, best_feature] <= best_thresh
+        left = self._grow_tree(X, y, idxs[go_left], depth + 1)
+        right = self._grow_tree(X, y, idxs[~go_left], depth + 1)
+        self._records[node_id] = (best_feature, best_thresh, left, right, -1)
+        return node_id
+
+    def _grow_tree_binned(self, X_binned, y, idxs, hist, depth=0):
+        n_samples = self._node_size(idxs)
+        counts = hist[0].sum(axis=0)
+        n_labels = np.count_nonzero(counts)
+
+        # n_labels is 0 when every sample in the node has zero weight.
+        if (depth >= self.max_depth or n_labels <= 1 or n_samples < self.min_samples_split):
+            return self._add_leaf(y[idxs], counts, self._node_weight(idxs))
+
+        feat_idxs = self._rng.choice(X_binned.shape[1], self.n_features, replace=False)
+
+        with PROFILER.stage('tree.best_split'):
+            best_feature, best_bin, decrease = self._best_split_binned(hist, feat_idxs)
+        if best_feature is None:
+            return self._add_leaf(y[idxs], counts, self._node_weight(idxs))
+        self._importances[best_feature] += decrease
+
+        node_id = self._add_split(counts)
+        go_left = X_binned[idxs, best_feature] <= best_bin
+        left_idxs, right_idxs = idxs[go_left], idxs[~go_left]
+
+        # Only the smaller child is counted; its sibling is parent - child.
+        if len(left_idxs) <= len(right_idxs):
+            left_hist = self._histogram(X_binned, y, left_idxs)
+            right_hist = hist - left_hist
+        else:
+            right_hist = self._histogram(X_binned, y, right_idxs)
+            left_hist = hist - right_hist
+
+        left = self._grow_tree_binned(X_binned, y, left_idxs, left_hist, depth + 1)
+        right = self._grow_tree_binned(X_binned, y, right_idxs, right_hist, depth + 1)
+        self._records[node_id] = (best_feature, self._bin_edges[best_feature][best_bin], left, right, -1)
+        return node_id
+
+    def _node_weight(self, idxs):
+        return None if self._sample_weight is None else self._sample_weight[idxs]
+
+    def _node_size(self, idxs):
+        return len(idxs) if self._row_counts is None else int(self._row_counts[idxs].sum())
+
+    def _histogram(self, X_binned, y, idxs):
+        n_feats = X_binned.shape[1]
+        n_bins, n_classes = self._n_bins, self._n_classes
+        offsets = np.arange(n_feats) * n_bins
+        with PROFILER.stage('tree.histogram'):
+            flat = (X_binned[idxs].astype(np.intp) + offsets) * n_classes + y[idxs, None]
+            weights = None
+            if self._sample_weight is not None:
+                weights = np.broadcast_to(self._sample_weight[idxs, None], flat.shape).ravel()
+            hist = np.bincount(flat.ravel(), weights=weights, minlength=n_feats * n_bins * n_classes)
+        return hist.reshape(n_feats, n_bins, n_classes)
+
+    def _best_split_binned(self, hist, feat_idxs):
+        # Same scan as _best_split, over bins instead of sorted samples.
+        node_hist = hist[feat_idxs]
+        left_counts = np.cumsum(node_hist, axis=1)
+        total_counts = left_counts[:, -1:]
+        right_counts = total_counts - left_counts
+
+        n_l = left_counts.sum(axis=2)
+        n_samples = n_l[0, -1]
+        if n_samples == 0:  # zero total weight: every gain would be NaN
+            return None, None, 0.0
+        n_r = n_samples - n_l
+        parent_impurity = self._node_impurity(total_counts[0], n_samples)
+        i_l = self._node_impurity(left_counts, n_l)
+        i_r = self._node_impurity(right_counts, n_r)
+        gains = parent_impurity - ((n_l / n_samples) * i_l + (n_r / n_samples) * i_r)
+
+        # A bin is a threshold only if it holds samples and leaves some on the right.
+        gains[(node_hist.sum(axis=2) == 0) | (n_r == 0)] = -np.inf
+
+        best_bins = np.argmax(gains, axis=1)
+        best_gains = gains[np.arange(len(feat_idxs)), best_bins]
+        best_row = np.argmax(best_gains)
+        if best_gains[best_row] == -np.inf:
+            return None, None, 0.0
+
+        # The decrease is weighted by the node's size for feature_importances_.
+        return feat_idxs[best_row], best_bins[best_row], n_samples * best_gains[best_row]
+
+    def _best_split(self, X, idxs, y, feat_idxs, sample_weight=None):
+        # Candidate features are scanned in blocks small enough that a
+        # block's (rows, features, classes) count arrays stay within
+        # SPLIT_BLOCK_CELLS; large nodes go one feature at a time.
+        n_samples = len(y)
+        n_classes = y.max() + 1
+        block_size = max(1, SPLIT_BLOCK_CELLS // (n_samples * n_classes))
+        parent = None
+        best_gain, best_row, best_feature, best_thresh = -np.inf, None, None, None
+        for start in range(0, len(feat_idxs), block_size):
+            block = feat_idxs[start:start + block_size]
+            gain, row, col, X_sorted, parent = self._best_split_block(X[np.ix_(idxs, block)], y, n_classes,
+                                                                      sample_weight, parent)
+            # Strictly greater keeps the first maximum, as in the old scan
+            # order (features in feat_idxs order, thresholds ascending).
+            if gain > best_gain:
+                best_gain, best_row = gain, row
+                best_feature, best_thresh = block[col], X_sorted[row, col]
+        if best_row is None or best_row == n_samples - 1:
+            return None, None, 0.0
+
+        # The decrease is weighted by the node's size for feature_importances_.
+        return best_feature, best_thresh, parent[1] * best_gain
+
+    def _best_split_block(self, X_cols, y, n_classes, sample_weight, parent):
+        # X_cols holds the node's rows of one block of candidate columns.
+        # Sort every column once and scan prefix class-count
+        # histograms: row i of left_counts holds the labels of the i + 1
+        # smallest values, i.e. the left side of a split at X_sorted[i].
+        # With sample weights the histograms sum weights instead.
+        n_samples = len(y)
+        order = np.argsort(X_cols, axis=0, kind='stable')
+        X_sorted = np.take_along_axis(X_cols, order, axis=0)
+
+        if sample_weight is None:
+            onehot = np.eye(n_classes, dtype=np.int64)[y[order]]
+            n_l = np.arange(1, n_samples + 1)[:, None]
+        else:
+            onehot = np.eye(n_classes, dtype=sample_weight.dtype)[y[order]] * sample_weight[order][..., None]
+            n_l = np.cumsum(sample_weight[order], axis=0)
+        left_counts = np.cumsum(onehot, axis=0, out=onehot)
+
+        # The parent impurity and total weight come from the first candidate
+        # feature and are reused by later blocks, as with one full scan.
+        if parent is None:
+            n_total = n_l[-1, 0]
+            parent = self._node_impurity(left_counts[-1, :1], n_total), n_total
+        parent_impurity, n_total = parent
+        if n_total == 0:  # zero total weight: every gain would be NaN
+            return -np.inf, None, None, X_sorted, parent
+
+        n_r = n_total - n_l
+        i_l = self._node_impurity(left_counts, n_l)
+        # right_counts reuses the left buffer, which is no longer needed
+        right_counts = np.subtract(left_counts[-1], left_counts, out=left_counts)
+        i_r = self._node_impurity(right_counts, n_r)
+        gains = parent_impurity - ((n_l / n_total) * i_l + (n_r / n_total) * i_r)
+
+        # Only the last occurrence of each value is a threshold; the largest
+        # value leaves the right side empty and scores 0 like before.
+        is_threshold = np.ones(gains.shape, dtype=bool)
+        is_threshold[:-1] = X_sorted[:-1] != X_sorted[1:]
+        gains[-1] = 0
+        gains[~is_threshold] = -np.inf
+
+        best_rows = np.argmax(gains, axis=0)
+        best_col = np.argmax(gains[best_rows, np.arange(X_cols.shape[1])])
+        return gains[best_rows[best_col], best_col], best_rows[best_col], best_col, X_sorted, parent
+
+    def _node_impurity(self, counts, n):
+        with PROFILER.stage('tree.impurity'):
+            return self._impurity(counts, n)
+
+    def _most_common_label(self, y, sample_weight=None):
+        # Ties go to the label seen first, like Counter.most_common.
+        totals = np.bincount(y, weights=sample_weight)
+        return y[np.argmax(totals[y] == totals.max())]
 
     def predict(self, X):
         if isinstance(X, pd.DataFrame):  # Check if X is a DataFrame
             X = X.values  # Convert DataFrame to numpy array
-        return np.array([self._traverse_tree(x, self.root) for x in X])
-
-    def _traverse_tree(self, x, node):
-        if node.is_leaf_node():
-            return node.value
-        if x[node.feature] <= node.threshold:
-            return self._traverse_tree(x, node.left)
-        return self._traverse_tree(x, node.right)
+        return self.tree.value[self.tree.apply(X)].astype(np.int64)
+
+
+def _bootstrap_samples(n_samples, rng=np.random):
+    """
+    Draws a bootstrap sample of row indices without copying X.
+
+    Returns:
+        tuple: (rows, counts). rows lists every drawn row once, in the
+        order of its first draw (leaf ties still go to the label drawn
+        first); counts[i] is how many times row i was drawn.
+    """
+    idxs = rng.choice(n_samples, n_samples, replace=True)
+    _, first = np.unique(idxs, return_index=True)
+    return idxs[np.sort(first)], np.bincount(idxs, minlength=n_samples)
+
+
+def _build_tree(tree_params, X, y, sample_weight, bin_edges, seed, X_oob=None, profile_pid=None, rows=None):
+    # One RandomForest tree, fitted on a bootstrap drawn from seed. In a
+    # worker process the stages are recorded on a fresh profiler and sent
+    # back as a snapshot for the parent to merge.
+    in_worker = profile_pid is not None and profile_pid != os.getpid()
+    if in_worker:
+        PROFILER.reset()
+        PROFILER.enable()
+
+    rng = np.random.default_rng(seed)
+    tree = DecisionTree(**tree_params)
+    # The tree reads the shared X through the drawn rows; how often a
+    # row was drawn becomes its weight instead of a copied sample.
+    # With rows the bootstrap is drawn from those rows only and mapped back
+    # to row numbers of the shared X.
+    with PROFILER.stage('forest.bootstrap'):
+        drawn, counts = _bootstrap_samples(X.shape[0] if rows is None else len(rows), rng)
+        out_of_bag = np.flatnonzero(counts == 0)
+        if rows is not None:
+            drawn, out_of_bag = rows[drawn], rows[out_of_bag]
+            subset_counts, counts = counts, np.zeros(X.shape[0], dtype=counts.dtype)
+            counts[rows] = subset_counts
+    weight = counts if sample_weight is None else counts * sample_weight
+    if bin_edges is None:
+        tree._fit_exact(X, y, rng, weight, drawn, counts)
+    else:
+        tree._fit_binned(X, y, bin_edges, rng, weight, drawn, counts)
+
+    oob_idxs = oob_preds = None
+    if X_oob is not None:
+        oob_idxs = out_of_bag
+        oob_preds = tree.predict(X_oob[oob_idxs])
+
+    profile = None
+    if in_worker:
+        profile = PROFILER.snapshot()
+        PROFILER.disable()
+        PROFILER.reset()
+    return tree, oob_idxs, oob_preds, profile
 
 
 class RandomForest:
-    def __init__(self, n_trees=10, max_depth=10, min_samples_split=2, n_feature=None):
+    def __init__(self, n_trees=10, max_depth=10, min_samples_split=2, n_feature=None, max_bins=None,
+                 n_jobs=None, random_state=None, oob_score=False, warm_start=False, criterion='entropy'):
         self.n_trees = n_trees
         self.max_depth = max_depth
         self.min_samples_split = min_samples_split
         self.n_features = n_feature
+        self.max_bins = max_bins
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.oob_score = oob_score
+        self.warm_start = warm_start
+        self.criterion = criterion
         self.trees = []
 
-    def fit(self, X, y):
+    def __setstate__(self, state):
+        # Older pickles predate some parameters; fall back to their defaults.
+        self.__dict__.update(max_bins=None, n_jobs=None, random_state=None, oob_score=False, warm_start=False,
+                             criterion='entropy')
+        self.__dict__.update(state)
+
+    def __getstate__(self):
+        # The stacked copy of the trees is rebuilt on demand, never pickled.
+        state = self.__dict__.copy()
+        state.pop('_stacked', None)
+        return state
+
+    def fit(self, X, y, sample_weight=None, binning=None, rows=None):
+        """
+        Fits n_trees trees (only the missing ones with warm_start).
+
+        Args:
+            X (numpy.ndarray): Feature matrix.
+            y (numpy.ndarray): Encoded labels.
+            sample_weight (numpy.ndarray): Optional non-negative row weights.
+            binning (tuple): Optional (bin_edges, X_binned) already computed
+                for this X with compute_bin_edges/apply_bins, so repeated
+                fits on the same rows (warm-start growth, parameter search)
+                skip the quantization. Only used when max_bins is set.
+            rows (numpy.ndarray): Optional distinct row indices to fit on.
+                The trees read them from X in place, so a subset (e.g. a
+                cross-validation fold) is not copied. binning and
+                sample_weight still cover all of X; OOB votes only go to
+                these rows.
+        """
         if isinstance(X, pd.DataFrame):  # Check if X is a DataFrame
             X = X.values  # Convert DataFrame to numpy array
         if isinstance(y, pd.Series):  # Check if y is a Series
             y = y.values  # Convert Series to numpy array
-
-        self.trees = []
-        for _ in range(self.n_trees):
-            tree = DecisionTree(max_depth=self.max_depth,
-                                min_samples_split=self.min_samples_split,
-                                n_features=self.n_features)
-            X_sample, y_sample = self._bootstrap_samples(X, y)
-            tree.fit(X_sample, y_sample)
+        _check_criterion(self.criterion)
+        sample_weight = _check_sample_weight(sample_weight, len(y))
+        if binning is not None and len(binning[1]) != len(y):
+            raise ValueError(f"binning covers {len(binning[1])} rows, expected {len(y)}")
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.intp)
+
+        # With warm_start an existing forest keeps its trees and only the
+        # missing n_trees - len(trees) are fitted.
+        if not self.warm_start or not self.trees:
+            self.trees = []
+            self._init_seeds()
+            if self.oob_score:
+                self._oob_votes = np.zeros((len(y), y.max() + 1), dtype=np.int64)
+        elif self.oob_score and len(getattr(self, '_oob_votes', ())) != len(y):
+            raise ValueError("warm_start with oob_score needs the same rows as the fit that built the forest")
+        n_new = self.n_trees - len(self.trees)
+        if n_new < 0:
+            raise ValueError(f"n_trees={self.n_trees} is smaller than the {len(self.trees)} trees already fitted")
+
+        with PROFILER.stage('forest.fit', memory=True):
+            self._grow_trees(X, y, n_new, oob=self.oob_score, sample_weight=sample_weight, binning=binning,
+                             rows=rows)
+        if self.oob_score:
+            self._set_oob_score(y, self._oob_votes)
+
+    def replace_trees(self, X, y, n_replace, sample_weight=None):
+        """
+        Retires the n_replace oldest trees and fits as many new ones on X, y.
+
+        Calling this with each batch of newly arrived rows keeps the forest
+        a sliding window over recent data at a cost proportional to the new
+        rows. n_trees is unchanged; OOB results from fit() no longer apply
+        and are dropped.
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X.values
+        if isinstance(y, pd.Series):
+            y = y.values
+        if not 0 < n_replace <= len(self.trees):
+            raise ValueError(f"n_replace must be between 1 and {len(self.trees)}")
+        _check_criterion(self.criterion)
+        sample_weight = _check_sample_weight(sample_weight, len(y))
+
+        del self.trees[:n_replace]
+        with PROFILER.stage('forest.fit', memory=True):
+            self._grow_trees(X, y, n_replace, oob=False, sample_weight=sample_weight)
+        for attr in ('oob_score_', 'oob_decision_function_', 'oob_prediction_', 'oob_report_', '_oob_votes'):
+            self.__dict__.pop(attr, None)
+
+    def _init_seeds(self):
+        # Tree i draws from SeedSequence(entropy, spawn_key=(i,)), the i-th
+        # child of one SeedSequence, so the forest depends only on
+        # random_state, never on n_jobs, scheduling or warm-start steps.
+        # Without a random_state the entropy comes from the global numpy RNG.
+        entropy = self.random_state
+        if entropy is None:
+            entropy = np.random.randint(np.iinfo(np.int32).max)
+        self._seed_entropy = int(entropy)
+        self._next_seed = 0
+
+    def _grow_trees(self, X, y, n_new, oob=False, sample_weight=None, binning=None, rows=None):
+        if not hasattr(self, '_seed_entropy'):  # forest pickled before warm_start existed
+            self._init_seeds()
+        seeds = [np.random.SeedSequence(self._seed_entropy, spawn_key=(i,))
+                 for i in range(self._next_seed, self._next_seed + n_new)]
+        self._next_seed += n_new
+
+        # Histogram mode quantizes the features once for the whole batch of
+        # trees; trees still store raw thresholds, so predict takes unbinned X.
+        bin_edges = None
+        X_fit = X
+        if self.max_bins:
+            if binning is None:
+                # Edges come from the fitted rows only; all of X is binned
+                # because the trees index it by row number.
+                bin_edges = compute_bin_edges(X if rows is None else X[rows], self.max_bins)
+                binning = bin_edges, apply_bins(X, bin_edges)
+            bin_edges, X_fit = binning
+
+        # joblib memory-maps large arrays for the worker processes, so X is
+        # shared between them instead of being pickled into every task. The
+        # task is a module-level function given only the tree parameters, so
+        # the forest itself (existing trees, OOB votes) is not pickled either.
+        # With oob each worker also predicts the rows its bootstrap left
+        # out, and the votes are added up as the trees come back.
+        X_oob = X if oob else None
+        tree_params = {'max_depth': self.max_depth, 'min_samples_split': self.min_samples_split,
+                       'n_features': self.n_features, 'criterion': self.criterion}
+        profile_pid = os.getpid() if PROFILER.enabled else None
+        results = Parallel(n_jobs=self.n_jobs, return_as='generator')(
+            delayed(_build_tree)(tree_params, X_fit, y, sample_weight, bin_edges, seed, X_oob, profile_pid, rows)
+            for seed in seeds
+        )
+        for tree, oob_idxs, oob_preds, profile in results:
             self.trees.append(tree)
+            if oob:
+                self._oob_votes[oob_idxs, oob_preds] += 1
+            if profile is not None:
+                PROFILER.merge(profile)
+
+    def _set_oob_score(self, y, oob_votes):
+        # Rows drawn into every bootstrap have no OOB vote and are left out.
+        has_vote = oob_votes.sum(axis=1) > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.oob_decision_function_ = oob_votes / oob_votes.sum(axis=1, keepdims=True)
+        self.oob_prediction_ = np.where(has_vote, np.argmax(oob_votes, axis=1), -1)
+
+        y_true, y_pred = y[has_vote], self.oob_prediction_[has_vote]
+        self.oob_score_ = np.mean(y_true == y_pred)
+        self.oob_report_ = class_metrics(y_true, y_pred, oob_votes.shape[1])
+
+    @property
+    def feature_importances_(self):
+        """
+        Mean decrease in impurity per feature, averaged over the trees and
+        normalized to sum to 1. Recorded while the trees are fitted, so it
+        is not available for trees loaded from an artifact.
+        """
+        per_tree = [tree.feature_importances_ for tree in self.trees if hasattr(tree, 'feature_importances_')]
+        if not per_tree:
+            raise AttributeError("feature_importances_ needs trees fitted in this session (not loaded from an artifact)")
+        importances = np.mean(per_tree, axis=0)
+        total = importances.sum()
+        return importances / total if total > 0 else importances
+
+    def feature_contributions(self, X, batch_size=256):
+        """
+        Per-feature contributions to the forest's mean leaf class distribution.
+
+        Each tree's prediction is decomposed along its decision path
+        (Saabas): the root distribution is the bias, and every split adds
+        child minus parent distribution to its feature. Averaged over the
+        trees, bias + contributions.sum(axis=1) is the mean of the leaf
+        distributions, a soft version of the vote fractions from
+        predict_proba. All trees are stacked into one set of node arrays,
+        so a batch of rows takes one traversal for the whole forest.
+
+        Args:
+            X (numpy.ndarray): Feature matrix.
+            batch_size (int): Rows traversed together.
+
+        Returns:
+            tuple: (bias of shape (n_classes,), contributions of shape
+            (n_rows, n_features, n_classes)).
+        """
+        _, _, bias, contributions = self.explain(X, batch_size)
+        return bias, contributions
+
+    def explain(self, X, batch_size=256):
+        """
+        Predictions, vote fractions and feature contributions from the one
+        stacked traversal feature_contributions makes; the leaves it reaches
+        give every tree's vote, so nothing is traversed twice.
+
+        Returns:
+            tuple: (predictions as from predict, vote fractions over all
+            trees as from predict_proba, bias, contributions).
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X.values
+        stacked = self._stacked_trees()
+        n_trees = len(stacked['roots'])
+        n_classes = self._n_classes()
+        n_dist = stacked['distribution'].shape[1]
+        predictions = np.empty(len(X), dtype=np.int64)
+        proba = np.empty((len(X), n_classes))
+        contributions = np.empty((len(X), X.shape[1], n_dist))
+        bias = stacked['distribution'][stacked['roots']].mean(axis=0, dtype=np.float64)
+        with PROFILER.stage('forest.contributions'):
+            for start in range(0, len(X), batch_size):
+                batch = slice(start, start + batch_size)
+                _, contributions[batch], leaves = _path_contributions(
+                    X[batch], stacked['feature'], stacked['threshold'], stacked['left'],
+                    stacked['right'], stacked['distribution'], stacked['roots'])
+                tree_preds = stacked['value'][leaves].reshape(n_trees, -1)
+                votes = self._vote_counts(tree_preds, n_classes)
+                predictions[batch] = self._majority_vote(tree_preds, votes)
+                proba[batch] = votes / n_trees
+        PROFILER.count('forest.predict_rows', len(X))
+        return predictions, proba, bias, contributions
+
+    def _stacked_trees(self):
+        # All trees' node arrays concatenated, child indices shifted to the
+        # stacked numbering; cached until the list of trees changes.
+        compiled = [tree.tree for tree in self.trees]
+        cached = getattr(self, '_stacked', None)
+        if cached is not None and len(cached['trees']) == len(compiled) and \
+                all(a is b for a, b in zip(cached['trees'], compiled)):
+            return cached
+        if any(tree.distribution is None for tree in compiled):
+            raise AttributeError("feature_contributions needs trees fitted with node class distributions "
+                                 "(retrain the model)")
+
+        offsets = np.cumsum([0] + [tree.n_nodes for tree in compiled])
+        n_classes = max(tree.distribution.shape[1] for tree in compiled)
+        distribution = np.zeros((offsets[-1], n_classes), dtype=np.float32)
+        for tree, start in zip(compiled, offsets):
+            # Trees refitted on rows without the last classes have fewer columns
+            distribution[start:start + tree.n_nodes, :tree.distribution.shape[1]] = tree.distribution
+
+        def children(name):
+            return np.concatenate([np.where(getattr(tree, name) == -1, -1, getattr(tree, name) + start)
+                                   for tree, start in zip(compiled, offsets)]).astype(np.intp)
+
+        self._stacked = {
+            'trees': compiled,
+            'feature': np.concatenate([tree.feature for tree in compiled]).astype(np.intp),
+            'threshold': np.concatenate([tree.threshold for tree in compiled]),
+            'value': np.concatenate([tree.value for tree in compiled]).astype(np.intp),
+            'left': children('left'),
+            'right': children('right'),
+            'distribution': distribution,
+            'roots': offsets[:-1].astype(np.intp),
+        }
+        return self._stacked
+
+    def predict(self, X, batch_size=65536):
+        if isinstance(X, pd.DataFrame):
+            X = X.values
 
-    def _bootstrap_samples(self, X, y):
-        n_samples = X.shape[0]
-        idxs = np.random.choice(n_samples, n_samples, replace=True)
-        return X[idxs], y[idxs]
-
-    def _most_common_label(self, y):
-        counter = Counter(y)
-        most_common = counter.most_common(1)[0][0]
-        return most_common
+        # Rows are scored in batches so the (n_trees, batch) prediction
+        # matrix stays small however many rows come in.
+        n_classes = self._n_classes()
+        predictions = np.empty(len(X), dtype=np.int64)
+        with PROFILER.stage('forest.predict', memory=True):
+            for start in range(0, len(X), batch_size):
+                tree_preds = self._tree_predictions(X[start:start + batch_size])
+                votes = self._vote_counts(tree_preds, n_classes)
+                predictions[start:start + batch_size] = self._majority_vote(tree_preds, votes)
+        PROFILER.count('forest.predict_rows', len(X))
+        return predictions
 
-    def predict(self, X):
+    def predict_proba(self, X, chunk_size=None, confidence=None, return_n_trees=False, batch_size=65536):
+        """
+        Returns the fraction of trees voting for each class.
+
+        With chunk_size set, trees are evaluated chunk_size at a time and a row
+        stops as soon as its leading class can no longer be overtaken by the
+        trees left, or, if confidence is given, once the leader holds that
+        share of the votes cast so far. Fractions are then taken over the
+        trees actually evaluated for the row.
+
+        Args:
+            X (numpy.ndarray): Feature matrix.
+            chunk_size (int): Trees per early-exit check; None evaluates all trees.
+            confidence (float): Optional vote share at which a row may stop.
+            return_n_trees (bool): Also return the trees evaluated per row.
+
+        Returns:
+            numpy.ndarray: Array of shape (n_rows, n_classes), plus an array of
+            tree counts when return_n_trees is True.
+        """
         if isinstance(X, pd.DataFrame):
             X = X.values
 
-        predictions = np.array([tree.predict(X) for tree in self.trees])
-        tree_preds = np.swapaxes(predictions, 0, 1)
-        predictions = np.array([self._most_common_label(pred) for pred in tree_preds])
-        return predictions
+        n_classes = self._n_classes()
+        with PROFILER.stage('forest.predict_proba', memory=True):
+            if chunk_size is None:
+                votes = np.empty((len(X), n_classes), dtype=np.int64)
+                for start in range(0, len(X), batch_size):
+                    tree_preds = self._tree_predictions(X[start:start + batch_size])
+                    votes[start:start + batch_size] = self._vote_counts(tree_preds, n_classes)
+                n_trees = np.full(len(X), len(self.trees))
+            else:
+                votes, n_trees = self._early_exit_votes(X, n_classes, chunk_size, confidence)
+        PROFILER.count('forest.predict_rows', len(X))
+        PROFILER.count('forest.trees_evaluated', int(n_trees.sum()))
+
+        proba = votes / n_trees[:, None]
+        if return_n_trees:
+            return proba, n_trees
+        return proba
+
+    def _early_exit_votes(self, X, n_classes, chunk_size, confidence):
+        votes = np.zeros((len(X), n_classes), dtype=np.int64)
+        n_trees = np.zeros(len(X), dtype=np.int64)
+        active = np.arange(len(X))
+        for start in range(0, len(self.trees), chunk_size):
+            trees = self.trees[start:start + chunk_size]
+            tree_preds = self._tree_predictions(X[active], trees)
+            votes[active] += self._vote_counts(tree_preds, n_classes)
+            n_trees[active] += len(trees)
+
+            remaining = len(self.trees) - start - len(trees)
+            top_two = np.sort(votes[active], axis=1)[:, -2:]
+            leader = top_two[:, -1]
+            runner_up = top_two[:, 0] if n_classes > 1 else 0
+            done = leader > runner_up + remaining
+            if confidence is not None:
+                done |= leader >= confidence * n_trees[active]
+            active = active[~done]
+            if not len(active):
+                break
+        return votes, n_trees
+
+    def _n_classes(self):
+        return max(int(tree.tree.value.max()) for tree in self.trees) + 1
+
+    def _tree_predictions(self, X, trees=None):
+        trees = self.trees if trees is None else trees
+        tree_preds = np.empty((len(trees), len(X)), dtype=np.intp)
+        with PROFILER.stage('forest.traverse'):
+            for i, tree in enumerate(trees):
+                tree_preds[i] = tree.tree.value[tree.tree.apply(X)]
+        return tree_preds
+
+    def _vote_counts(self, tree_preds, n_classes):
+        # One bincount over (row, class) pairs gives the (n_rows, n_classes) vote matrix.
+        n_rows = tree_preds.shape[1]
+        flat = np.arange(n_rows) * n_classes + tree_preds
+        return np.bincount(flat.ravel(), minlength=n_rows * n_classes).reshape(n_rows, n_classes)
+
+    def _majority_vote(self, tree_preds, votes):
+        # Counter.most_common broke ties in favour of the class it saw first,
+        # i.e. the tied class chosen by the earliest tree; keep that rule.
+        winners = np.argmax(votes, axis=1)
+        tied = votes == votes.max(axis=1, keepdims=True)
+        tied_rows = np.flatnonzero(tied.sum(axis=1) > 1)
+        if len(tied_rows):
+            candidates = tree_preds[:, tied_rows]
+            first = np.argmax(tied[tied_rows, candidates], axis=0)
+            winners[tied_rows] = candidates[first, np.arange(len(tied_rows))]
+        return winners
 
     def accuracy(y_true, y_pred):
         accuracy = np.sum(y_true == y_pred) / len(y_true)
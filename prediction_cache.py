@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from model_artifact import FEATURE_NAMES
+
+
+class PredictionCache:
+    """
+    Process-wide LRU cache of predictions keyed on encoded feature rows.
+
+    Keys are the bytes of the encoded row after rounding the columns named
+    in rounding to the given number of decimals, so near-identical inputs
+    (e.g. 70.04 and 70.01 kg with {'Weight': 1}) share one entry. Every
+    entry belongs to one model version; calling validate() with a new
+    version drops them all. Lookups and writes name the version the caller
+    predicts with, so a result computed with a model that has since been
+    replaced is neither served nor stored. Safe to share between Streamlit
+    sessions (threads).
+
+    Args:
+        maxsize (int): Entries kept before the least recently used is evicted.
+        rounding (dict): Feature name -> decimals for the cache key.
+        feature_names (list): Column order of the encoded rows.
+    """
+    def __init__(self, maxsize=4096, rounding=None, feature_names=FEATURE_NAMES):
+        self.maxsize = maxsize
+        self.rounding = [(feature_names.index(name), decimals) for name, decimals in (rounding or {}).items()]
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def key(self, row):
+        row = np.array(row, dtype=np.float64).ravel()
+        for j, decimals in self.rounding:
+            row[j] = np.round(row[j], decimals)
+        return row.tobytes()
+
+    def validate(self, version):
+        """
+        Clears the cache when version (e.g. artifact_version()) changed.
+        """
+        with self._lock:
+            if version != self.version:
+                if self.version is not None:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.version = version
+
+    def get(self, row, version):
+        key = self.key(row)
+        with self._lock:
+            value = self._entries.get(key) if version == self.version else None
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, row, value, version):
+        key = self.key(row)
+        with self._lock:
+            if version != self.version:  # computed with a model that was replaced meanwhile
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, row, compute, version):
+        """
+        Returns the cached value for row, or stores and returns compute().
+        version is the model version compute() predicts with.
+        """
+        value = self.get(row, version)
+        if value is None:
+            value = compute()
+            self.put(row, value, version)
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,131 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from model_artifact import FEATURE_NAMES, encoders_from_classes, write_manifest
+
+DATASET = 'ObesityDataSet_raw_and_data_sinthetic.csv'
+CACHE_DIR = 'data_cache'
+LABEL_COLUMNS = ['Gender', 'family_history_with_overweight', 'FAVC', 'CAEC', 'SMOKE', 'SCC', 'CALC', 'MTRANS', 'NObeyesdad']
+
+# Naikkan setiap kali langkah preprocessing di prepare() berubah, supaya cache lama dibangun ulang
+PIPELINE_VERSION = 1
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def prepare(csv_path=DATASET):
+    """
+    The training preprocessing: drop duplicates, fit one LabelEncoder per
+    categorical column (target included) and add BMI.
+
+    Returns:
+        tuple: (X as float64 in FEATURE_NAMES order, y as int64, dict of LabelEncoder).
+    """
+    data = pd.read_csv(csv_path).drop_duplicates()
+    label_encoders = {}
+    for col in LABEL_COLUMNS:
+        le = LabelEncoder()
+        data[col] = le.fit_transform(data[col])
+        label_encoders[col] = le
+    data['BMI'] = round(data['Weight'] / data['Height'] ** 2, 2)
+    y = data.pop('NObeyesdad').to_numpy(dtype=np.int64)
+    return data[FEATURE_NAMES].to_numpy(dtype=np.float64), y, label_encoders
+
+
+def write_cache(cache_dir, X, y, label_encoders, source):
+    """
+    Writes X.npy, y.npy and manifest.json (pipeline version, source file
+    size/mtime/sha256, feature order and encoder classes) to cache_dir.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(os.path.join(cache_dir, 'X.npy'), X)
+    np.save(os.path.join(cache_dir, 'y.npy'), y)
+    manifest = {
+        'pipeline_version': PIPELINE_VERSION,
+        'source': source,
+        'feature_names': FEATURE_NAMES,
+        'n_rows': len(y),
+        'encoders': {col: le.classes_.tolist() for col, le in label_encoders.items()},
+    }
+    # Manifest ditulis terakhir: cache tanpa manifest dianggap tidak ada
+    write_manifest(cache_dir, manifest)
+
+
+def _read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_fresh(manifest, csv_path):
+    """
+    A cache is fresh when it was built by this PIPELINE_VERSION from a file
+    with the same contents. Size and mtime are compared first; the file is
+    only hashed when they differ (e.g. after a touch or a copy).
+    """
+    if manifest is None or manifest['pipeline_version'] != PIPELINE_VERSION:
+        return False
+    if manifest['feature_names'] != FEATURE_NAMES:
+        return False
+    stat = os.stat(csv_path)
+    source = manifest['source']
+    if source['size'] != stat.st_size:
+        return False
+    if source['mtime'] == stat.st_mtime:
+        return True
+    return source['sha256'] == _file_sha256(csv_path)
+
+
+def load_prepared(csv_path=DATASET, cache_dir=CACHE_DIR, rebuild=False):
+    """
+    Returns the prepared dataset, from the cache when it is fresh.
+
+    The cache is (re)built from csv_path when it is missing, when the CSV
+    contents changed or when PIPELINE_VERSION was bumped. Loading a fresh
+    cache parses no CSV: X and y are memory-mapped .npy files.
+
+    Returns:
+        tuple: (X, y, dict of LabelEncoder), as prepare() returns them.
+    """
+    manifest = None if rebuild else _read_manifest(cache_dir)
+    if not _is_fresh(manifest, csv_path):
+        X, y, label_encoders = prepare(csv_path)
+        stat = os.stat(csv_path)
+        source = {'path': csv_path, 'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': _file_sha256(csv_path)}
+        write_cache(cache_dir, X, y, label_encoders, source)
+        return X, y, label_encoders
+
+    mtime = os.stat(csv_path).st_mtime
+    if manifest['source']['mtime'] != mtime:
+        # Isi sama (hash cocok), hanya mtime berubah: simpan supaya tidak di-hash lagi
+        manifest['source']['mtime'] = mtime
+        write_manifest(cache_dir, manifest)
+
+    X = np.load(os.path.join(cache_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(cache_dir, 'y.npy'), mmap_mode='r')
+    return X, y, encoders_from_classes(manifest['encoders'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Siapkan cache dataset terenkode (X, y, encoders)')
+    parser.add_argument('--csv', default=DATASET, help='file CSV dataset')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='direktori cache')
+    parser.add_argument('--force', action='store_true', help='bangun ulang walaupun cache masih valid')
+    args = parser.parse_args()
+
+    X, y, _ = load_prepared(args.csv, args.cache_dir, rebuild=args.force)
+    print(f"Cache dataset siap di '{args.cache_dir}' ({len(y)} baris, {X.shape[1]} fitur)")
@@ -0,0 +1,138 @@
+import json
+import os
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, profiler, name, memory):
+        self.profiler = profiler
+        self.name = name
+        self.memory = memory and profiler.trace_memory
+
+    def __enter__(self):
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stage = self.profiler.stages[self.name]
+        stage[0] += 1
+        stage[1] += elapsed
+        if self.memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            self.profiler.peak_memory[self.name] = max(self.profiler.peak_memory.get(self.name, 0), peak)
+        return False
+
+
+class Profiler:
+    """
+    Opt-in per-stage timing for training and serving.
+
+    Stages are timed with `with PROFILER.stage('name'):`. While the profiler
+    is disabled stage() hands back one shared no-op context manager, so the
+    instrumented code pays a method call and nothing else. Enable it with
+    PROFILER.enable() or by setting OBESITY_PROFILE=1 (OBESITY_PROFILE=memory
+    also records tracemalloc peaks for the fit/predict stages).
+    """
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.reset()
+
+    def reset(self):
+        self.stages = defaultdict(lambda: [0, 0.0])
+        self.counters = Counter()
+        self.tree_stats = []
+        self.peak_memory = {}
+
+    def enable(self, trace_memory=False):
+        self.enabled = True
+        self.trace_memory = trace_memory
+
+    def disable(self):
+        self.enabled = False
+        self.trace_memory = False
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def stage(self, name, memory=False):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, memory)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] += n
+
+    def record_tree(self, n_nodes, n_leaves, depth):
+        if self.enabled:
+            self.tree_stats.append((n_nodes, n_leaves, depth))
+
+    def snapshot(self):
+        """
+        Raw state, picklable, for merging results from worker processes.
+        """
+        return {
+            'stages': dict(self.stages),
+            'counters': dict(self.counters),
+            'tree_stats': list(self.tree_stats),
+            'peak_memory': dict(self.peak_memory),
+        }
+
+    def merge(self, snapshot):
+        for name, (calls, total) in snapshot['stages'].items():
+            self.stages[name][0] += calls
+            self.stages[name][1] += total
+        self.counters.update(snapshot['counters'])
+        self.tree_stats.extend(snapshot['tree_stats'])
+        for name, peak in snapshot['peak_memory'].items():
+            self.peak_memory[name] = max(self.peak_memory.get(name, 0), peak)
+
+    def report(self):
+        """
+        Structured summary: per-stage calls and wall time, counters, tree
+        size/depth/leaf statistics and peak memory per stage.
+        """
+        stages = {
+            name: {'calls': calls, 'total_s': total, 'mean_ms': total / calls * 1000.0 if calls else 0.0}
+            for name, (calls, total) in sorted(self.stages.items(), key=lambda item: -item[1][1])
+        }
+        trees = {}
+        if self.tree_stats:
+            for i, key in enumerate(['nodes', 'leaves', 'depth']):
+                values = [stats[i] for stats in self.tree_stats]
+                trees[key] = {'min': min(values), 'mean': sum(values) / len(values), 'max': max(values)}
+            trees['count'] = len(self.tree_stats)
+        return {
+            'stages': stages,
+            'counters': dict(self.counters),
+            'trees': trees,
+            'peak_memory_bytes': dict(self.peak_memory),
+        }
+
+    def export(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+
+PROFILER = Profiler()
+
+if os.environ.get('OBESITY_PROFILE'):
+    PROFILER.enable(trace_memory=os.environ['OBESITY_PROFILE'] == 'memory')
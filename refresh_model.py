@@ -0,0 +1,46 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from feature_encoder import FeatureEncoder
+from model_artifact import FEATURE_NAMES, append_trees, load_artifact, retire_trees
+
+ARTIFACT_DIR = 'models/model_random_forest'
+
+
+def refresh_artifact(csv_path, artifact_dir=ARTIFACT_DIR, n_replace=30, n_jobs=None):
+    """
+    Replaces the n_replace oldest trees of a saved forest with trees fitted
+    on the rows in csv_path (dataset schema, including NObeyesdad).
+
+    Only the new trees are written, as one extra artifact segment; the cost
+    grows with the new rows and n_replace, not with the size of the forest
+    or the history it was trained on.
+    """
+    # Artifact akan ditambah segmen baru, jadi checksum array lama diperiksa dulu
+    model, label_encoders = load_artifact(artifact_dir, feature_names=FEATURE_NAMES, verify=True)
+    model.n_jobs = n_jobs
+
+    data = pd.read_csv(csv_path).drop_duplicates()
+    X = FeatureEncoder(label_encoders).encode_frame(data)
+    y = pd.Categorical(data['NObeyesdad'], categories=label_encoders['NObeyesdad'].classes_).codes
+    if (y < 0).any():
+        raise ValueError(f"Unknown NObeyesdad values in {csv_path}")
+
+    model.replace_trees(X, y.astype(np.int64), n_replace)
+    append_trees(artifact_dir, model.trees[-n_replace:], model)
+    retire_trees(artifact_dir, n_replace)
+    return model
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Perbarui forest dengan data baru (sliding window per pohon)')
+    parser.add_argument('input', help='CSV data baru dengan kolom yang sama seperti dataset')
+    parser.add_argument('--artifact', default=ARTIFACT_DIR, help='direktori artifact model')
+    parser.add_argument('--replace', type=int, default=30, help='jumlah pohon tertua yang diganti')
+    parser.add_argument('--n-jobs', type=int, default=None, help='jumlah proses untuk membangun pohon')
+    args = parser.parse_args()
+
+    refresh_artifact(args.input, args.artifact, args.replace, args.n_jobs)
+    print(f"{args.replace} pohon tertua diganti dengan pohon dari '{args.input}'")
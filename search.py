@@ -0,0 +1,220 @@
+import argparse
+import itertools
+import json
+import math
+import sys
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+
+from model_knn import KNN
+from model_randomforest import RandomForest, apply_bins, compute_bin_edges
+from prepare_data import load_prepared
+
+DEFAULT_GRIDS = {
+    'random_forest': {
+        'n_trees': [50, 100, 300],
+        'max_depth': [10, 20],
+        'min_samples_split': [2, 5],
+        'n_feature': [None, 8],
+    },
+    'knn': {
+        'k': list(range(2, 22)),
+    },
+}
+
+
+def param_grid(grid):
+    """
+    Expands {'name': [values, ...]} into a list of parameter dicts.
+    """
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def kfold_indices(n_samples, n_splits=5, seed=0):
+    """
+    Shuffled k-fold split; returns a list of (train_idxs, test_idxs).
+    """
+    order = np.random.default_rng(seed).permutation(n_samples)
+    folds = np.array_split(order, n_splits)
+    return [(np.sort(np.concatenate(folds[:i] + folds[i + 1:])), np.sort(folds[i])) for i in range(n_splits)]
+
+
+def _fold_binnings(X, folds, max_bins_values):
+    # Bin edges depend only on the training rows of a fold, so they are
+    # computed once per (fold, max_bins) and shared by every configuration.
+    # All of X is binned: the forests read the fold's rows by index.
+    binnings = {}
+    for i, (train_idxs, _) in enumerate(folds):
+        for max_bins in max_bins_values:
+            if max_bins:
+                bin_edges = compute_bin_edges(X[train_idxs], max_bins)
+                binnings[i, max_bins] = bin_edges, apply_bins(X, bin_edges)
+    return binnings
+
+
+def _evaluate_forest(X, y, train_idxs, test_idxs, params, n_trees_steps, seed, binning=None, forest=None,
+                     return_forest=False):
+    """
+    Grows one forest on a fold through each n_trees in n_trees_steps
+    (ascending) with warm_start, scoring the test rows after every step.
+    The training rows are read from the shared X by index, not copied.
+
+    Returns:
+        tuple: (list of accuracies, the fitted forest or None).
+    """
+    X_test, y_test = X[test_idxs], y[test_idxs]
+    if forest is None:
+        forest = RandomForest(**params, n_trees=n_trees_steps[0], n_jobs=1, random_state=seed, warm_start=True)
+    scores = []
+    for n_trees in n_trees_steps:
+        forest.n_trees = n_trees
+        forest.fit(X, y, binning=binning, rows=train_idxs)
+        scores.append(float(np.mean(forest.predict(X_test) == y_test)))
+    return scores, forest if return_forest else None
+
+
+def _evaluate_knn(X, y, train_idxs, test_idxs, params):
+    knn = KNN(**params)
+    knn.fit(X[train_idxs], y[train_idxs])
+    return float(np.mean(knn.predict(X[test_idxs]) == y[test_idxs]))
+
+
+def _summary(params, fold_scores, **extra):
+    return {
+        'params': params,
+        'mean_score': float(np.mean(fold_scores)),
+        'std_score': float(np.std(fold_scores)),
+        'fold_scores': list(fold_scores),
+        **extra,
+    }
+
+
+def grid_search(X, y, grid, model='random_forest', n_splits=5, n_jobs=None, seed=0):
+    """
+    Cross-validates every configuration in grid.
+
+    Work is spread over a joblib process pool, which memory-maps X and y
+    for the workers instead of copying them into every task. For a
+    RandomForest, configurations that differ only in n_trees share one
+    task per fold: the forest is grown with warm_start from the smallest
+    n_trees to the largest and scored at each step.
+
+    Returns:
+        list: One dict per configuration (params, mean_score, std_score,
+        fold_scores), best first.
+    """
+    folds = kfold_indices(len(y), n_splits, seed)
+
+    if model == 'knn':
+        configs = param_grid(grid)
+        scores = Parallel(n_jobs=n_jobs)(
+            delayed(_evaluate_knn)(X, y, train_idxs, test_idxs, params)
+            for params in configs for train_idxs, test_idxs in folds
+        )
+        results = [_summary(params, scores[i * n_splits:(i + 1) * n_splits]) for i, params in enumerate(configs)]
+    else:
+        n_trees_steps = sorted(grid.get('n_trees', [10]))
+        groups = param_grid({name: values for name, values in grid.items() if name != 'n_trees'})
+        binnings = _fold_binnings(X, folds, {params.get('max_bins') for params in groups})
+        tasks = [
+            delayed(_evaluate_forest)(X, y, train_idxs, test_idxs, params, n_trees_steps, seed,
+                                      binnings.get((i, params.get('max_bins'))))
+            for params in groups for i, (train_idxs, test_idxs) in enumerate(folds)
+        ]
+        outputs = Parallel(n_jobs=n_jobs)(tasks)
+        results = []
+        for g, params in enumerate(groups):
+            fold_scores = np.array([scores for scores, _ in outputs[g * n_splits:(g + 1) * n_splits]])
+            for step, n_trees in enumerate(n_trees_steps):
+                results.append(_summary({**params, 'n_trees': n_trees}, fold_scores[:, step]))
+
+    return sorted(results, key=lambda result: -result['mean_score'])
+
+
+def halving_search(X, y, grid, n_splits=5, n_jobs=None, seed=0, eta=3, min_trees=10):
+    """
+    Successive halving over RandomForest configurations with n_trees as the budget.
+
+    Every configuration starts with a small forest per fold. After each
+    rung only the best 1/eta are kept, and their forests (returned by
+    the workers) grow eta times larger with warm_start instead of being
+    refitted. The last rung uses the largest n_trees in the grid.
+
+    Returns:
+        list: One dict per configuration and rung it reached (params,
+        mean_score, std_score, fold_scores, rung), best final ones first.
+    """
+    folds = kfold_indices(len(y), n_splits, seed)
+    max_trees = max(grid.get('n_trees', [100]))
+    n_rungs = max(1, int(math.log(max_trees / min_trees, eta)) + 1)
+    budgets = [max(1, math.ceil(max_trees / eta ** (n_rungs - 1 - r))) for r in range(n_rungs)]
+
+    candidates = param_grid({name: values for name, values in grid.items() if name != 'n_trees'})
+    binnings = _fold_binnings(X, folds, {params.get('max_bins') for params in candidates})
+    forests = {}
+    results = []
+    for rung, n_trees in enumerate(budgets):
+        tasks = [
+            delayed(_evaluate_forest)(X, y, train_idxs, test_idxs, candidates[c], [n_trees], seed,
+                                      binnings.get((i, candidates[c].get('max_bins'))), forests.get((c, i)),
+                                      return_forest=rung < len(budgets) - 1)
+            for c in range(len(candidates)) for i, (train_idxs, test_idxs) in enumerate(folds)
+        ]
+        outputs = Parallel(n_jobs=n_jobs)(tasks)
+
+        rung_results = []
+        for c, params in enumerate(candidates):
+            fold_outputs = outputs[c * n_splits:(c + 1) * n_splits]
+            for i, (_, forest) in enumerate(fold_outputs):
+                forests[c, i] = forest
+            rung_results.append(_summary({**params, 'n_trees': n_trees},
+                                         [scores[0] for scores, _ in fold_outputs], rung=rung))
+        results.extend(rung_results)
+        print(f"rung {rung}: {len(candidates)} konfigurasi, {n_trees} pohon", file=sys.stderr)
+
+        if rung == len(budgets) - 1:
+            break
+        n_keep = max(1, math.ceil(len(candidates) / eta))
+        keep = sorted(range(len(candidates)), key=lambda c: -rung_results[c]['mean_score'])[:n_keep]
+        forests = {(new, i): forests[old, i] for new, old in enumerate(keep) for i in range(n_splits)}
+        candidates = [candidates[c] for c in keep]
+
+    return sorted(results, key=lambda result: (-result['rung'], -result['mean_score']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pencarian hyperparameter dengan k-fold cross-validation')
+    parser.add_argument('--model', choices=sorted(DEFAULT_GRIDS), default='random_forest')
+    parser.add_argument('--grid', help='grid parameter dalam JSON, mis. \'{"max_depth": [10, 20]}\'')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--halving', action='store_true', help='successive halving dengan n_trees sebagai budget')
+    parser.add_argument('--eta', type=int, default=3, help='faktor pemangkasan tiap rung (halving)')
+    parser.add_argument('--min-trees', type=int, default=10, help='jumlah pohon pada rung pertama (halving)')
+    parser.add_argument('--output', help='simpan seluruh hasil ke file JSON')
+    args = parser.parse_args()
+
+    grid = json.loads(args.grid) if args.grid else DEFAULT_GRIDS[args.model]
+    X, y, _ = load_prepared()
+
+    start = time.perf_counter()
+    if args.halving:
+        if args.model != 'random_forest':
+            parser.error('--halving hanya untuk random_forest')
+        results = halving_search(X, y, grid, args.folds, args.n_jobs, args.seed, args.eta, args.min_trees)
+    else:
+        results = grid_search(X, y, grid, args.model, args.folds, args.n_jobs, args.seed)
+    elapsed = time.perf_counter() - start
+
+    for result in results[:10]:
+        print(f"{result['mean_score']:.4f} ± {result['std_score']:.4f}  {json.dumps(result['params'])}")
+    print(f"Parameter terbaik: {json.dumps(results[0]['params'])} ({elapsed:.1f} detik)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Hasil pencarian disimpan di '{args.output}'")
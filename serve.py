@@ -0,0 +1,180 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+from feature_encoder import FeatureEncoder
+from model_artifact import FEATURE_NAMES, load_artifact
+
+ARTIFACT_DIR = 'models/model_random_forest'
+
+HTTP_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class MicroBatcher:
+    """
+    Groups concurrent single-row predictions into batches.
+
+    A batch closes when it reaches max_batch_size rows or when max_wait_ms
+    has passed since its first row arrived, then runs through one
+    RandomForest.predict call in a worker thread so the event loop keeps
+    accepting requests.
+    """
+    def __init__(self, model, max_batch_size=64, max_wait_ms=5.0, latency_window=10000):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        self.batch_sizes = Counter()
+        self.latencies = deque(maxlen=latency_window)
+        self.n_requests = 0
+
+    async def predict(self, row):
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future))
+        prediction = await future
+        self.latencies.append(time.perf_counter() - start)
+        self.n_requests += 1
+        return prediction
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            X = np.vstack([row for row, _ in batch])
+            try:
+                predictions = await loop.run_in_executor(None, self.model.predict, X)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batch_sizes[len(batch)] += 1
+            for (_, future), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result(prediction)
+
+    def metrics(self):
+        latencies_ms = np.array(self.latencies) * 1000.0
+        n_batches = sum(self.batch_sizes.values())
+        return {
+            'requests': self.n_requests,
+            'batches': n_batches,
+            'mean_batch_size': self.n_requests / n_batches if n_batches else 0.0,
+            'batch_sizes': {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            'latency_ms': {
+                'p50': float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else None,
+                'p99': float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else None,
+            },
+        }
+
+
+class PredictionServer:
+    """
+    Minimal HTTP/1.1 JSON service on asyncio streams (no extra dependencies).
+
+    POST /predict   body: form answers keyed by feature name, as in Buddy Scan
+    GET  /metrics   request count, batch-size histogram, p50/p99 latency
+    GET  /health
+    """
+    def __init__(self, model, label_encoders, max_batch_size=64, max_wait_ms=5.0):
+        self.feature_encoder = FeatureEncoder(label_encoders)
+        self.labels = label_encoders['NObeyesdad'].classes_
+        self.batcher = MicroBatcher(model, max_batch_size, max_wait_ms)
+
+    async def route(self, method, path, body):
+        if path == '/predict':
+            if method != 'POST':
+                return 405, {'error': 'use POST'}
+            try:
+                row = self.feature_encoder.encode(json.loads(body))
+            except (ValueError, KeyError, TypeError) as e:
+                return 400, {'error': f'invalid input: {e!r}'}
+            code = int(await self.batcher.predict(row))
+            return 200, {'prediction': str(self.labels[code]), 'code': code}
+        if path == '/metrics':
+            return 200, self.batcher.metrics()
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        return 404, {'error': f'unknown path {path}'}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                try:
+                    status, payload = await self.route(method, path.split('?', 1)[0], body)
+                except Exception as e:
+                    status, payload = 500, {'error': repr(e)}
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                data = json.dumps(payload).encode()
+                head = (
+                    f'HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n'
+                    f'Content-Type: application/json\r\n'
+                    f'Content-Length: {len(data)}\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+                )
+                writer.write(head.encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        batch_task = asyncio.create_task(self.batcher.run())
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Melayani prediksi di http://{host}:{port} (POST /predict, GET /metrics)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batch_task.cancel()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Layanan HTTP prediksi obesitas dengan micro-batching')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--artifact', default=ARTIFACT_DIR, help='direktori artifact model')
+    parser.add_argument('--max-batch-size', type=int, default=64, help='baris maksimum per batch')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help='waktu tunggu maksimum sebelum batch diproses')
+    args = parser.parse_args()
+
+    model, label_encoders = load_artifact(args.artifact, feature_names=FEATURE_NAMES)
+    server = PredictionServer(model, label_encoders, args.max_batch_size, args.max_wait_ms)
+    asyncio.run(server.serve(args.host, args.port))
@@ -0,0 +1,159 @@
+"""
+Checks the vectorized trees against the original implementation.
+
+_BaselineTree is the DecisionTree this module started from (one Python
+loop per threshold, Counter for votes). The rewritten split search and the
+compiled traversal must pick the same (feature, threshold) and predict the
+same labels, and a baseline pickle must still load.
+"""
+import pickle
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from model_randomforest import CompiledTree, DecisionTree, Node, RandomForest
+
+SEEDS = range(10)
+
+
+class _BaselineTree:
+    def __init__(self, min_samples_split=2, max_depth=100, n_features=None):
+        self.min_samples_split = min_samples_split
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.root = None
+
+    def fit(self, X, y):
+        self.n_features = X.shape[1] if not self.n_features else min(X.shape[1], self.n_features)
+        self.root = self._grow_tree(X, y)
+
+    def _grow_tree(self, X, y, depth=0):
+        n_samples, n_feats = X.shape
+        n_labels = len(np.unique(y))
+
+        if (depth >= self.max_depth or n_labels == 1 or n_samples < self.min_samples_split):
+            return Node(value=Counter(y).most_common(1)[0][0])
+
+        feat_idxs = np.random.choice(n_feats, self.n_features, replace=False)
+        best_feature, best_thresh = self._best_split(X, y, feat_idxs)
+
+        left_idxs, right_idxs = self._split(X[:, best_feature], best_thresh)
+        left = self._grow_tree(X[left_idxs, :], y[left_idxs], depth + 1)
+        right = self._grow_tree(X[right_idxs, :], y[right_idxs], depth + 1)
+        return Node(best_feature, best_thresh, left, right)
+
+    def _best_split(self, X, y, feat_idxs):
+        best_gain = -1
+        split_idx, split_threshold = None, None
+        for feat_idx in feat_idxs:
+            X_column = X[:, feat_idx]
+            for thr in np.unique(X_column):
+                gain = self._information_gain(y, X_column, thr)
+                if gain > best_gain:
+                    best_gain = gain
+                    split_idx = feat_idx
+                    split_threshold = thr
+        return split_idx, split_threshold
+
+    def _information_gain(self, y, X_column, threshold):
+        parent_entropy = self._entropy(y)
+        left_idxs, right_idxs = self._split(X_column, threshold)
+        if len(left_idxs) == 0 or len(right_idxs) == 0:
+            return 0
+        n = len(y)
+        n_l, n_r = len(left_idxs), len(right_idxs)
+        e_l, e_r = self._entropy(y[left_idxs]), self._entropy(y[right_idxs])
+        return parent_entropy - ((n_l / n) * e_l + (n_r / n) * e_r)
+
+    def _split(self, X_column, split_thresh):
+        return np.argwhere(X_column <= split_thresh).flatten(), np.argwhere(X_column > split_thresh).flatten()
+
+    def _entropy(self, y):
+        ps = np.bincount(y) / len(y)
+        return -np.sum([p * np.log(p) for p in ps if p > 0])
+
+    def predict(self, X):
+        return np.array([self._traverse_tree(x, self.root) for x in X])
+
+    def _traverse_tree(self, x, node):
+        if node.is_leaf_node():
+            return node.value
+        if x[node.feature] <= node.threshold:
+            return self._traverse_tree(x, node.left)
+        return self._traverse_tree(x, node.right)
+
+
+def _data(seed, n_samples=300, n_feats=6, n_classes=4):
+    # Continuous columns (no two rows identical) plus a few coarse columns
+    # with many repeated values, so tied thresholds are exercised too.
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_samples, n_feats))
+    X[:, :2] = np.round(X[:, :2], 1)
+    y = (X[:, 2] + rng.normal(scale=0.8, size=n_samples) > 0).astype(np.int64)
+    y += rng.integers(0, n_classes - 1, n_samples) * (X[:, 3] > 0.5)
+    return X, y
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_best_split_matches_baseline(seed):
+    X, y = _data(seed)
+    baseline = _BaselineTree()
+    tree = DecisionTree()
+    rng = np.random.default_rng(seed)
+    tree._start_fit(X.shape[1], y.max() + 1, rng, None, None)  # the state fit() sets up for the search
+    for _ in range(20):
+        idxs = np.sort(rng.choice(len(y), rng.integers(10, len(y)), replace=False))
+        feat_idxs = rng.choice(X.shape[1], 3, replace=False)
+        expected = baseline._best_split(X[idxs], y[idxs], feat_idxs)
+        feature, threshold, _ = tree._best_split(X, idxs, y[idxs], feat_idxs)
+        if len(np.unique(y[idxs])) > 1:
+            assert (feature, threshold) == expected
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_tree_matches_baseline(seed):
+    # Without a random_state both draw their features from the global RNG.
+    X, y = _data(seed)
+    X_test, _ = _data(seed + 100)
+    np.random.seed(seed)
+    baseline = _BaselineTree(max_depth=8, n_features=3)
+    baseline.fit(X, y)
+    np.random.seed(seed)
+    tree = DecisionTree(max_depth=8, n_features=3)
+    tree.fit(X, y)
+    np.testing.assert_array_equal(tree.predict(X_test), baseline.predict(X_test))
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_forest_vote_matches_counter(seed):
+    # Ties go to the class voted by the earliest tree, like Counter.most_common.
+    X, y = _data(seed)
+    X_test, _ = _data(seed + 100)
+    forest = RandomForest(n_trees=6, max_depth=4, n_feature=2, random_state=seed)
+    forest.fit(X, y)
+    tree_preds = np.array([tree.predict(X_test) for tree in forest.trees]).T
+    expected = [Counter(preds).most_common(1)[0][0] for preds in tree_preds]
+    np.testing.assert_array_equal(forest.predict(X_test), expected)
+
+
+def test_baseline_pickle_loads():
+    # Old pickles hold a Node graph in root; __setstate__ compiles it.
+    X, y = _data(0)
+    X_test, _ = _data(1)
+    np.random.seed(0)
+    baseline = _BaselineTree(max_depth=8, n_features=3)
+    baseline.fit(X, y)
+    tree = DecisionTree.__new__(DecisionTree)
+    tree.__setstate__(pickle.loads(pickle.dumps(baseline.__dict__)))
+    assert isinstance(tree.tree, CompiledTree)
+    np.testing.assert_array_equal(tree.predict(X_test), baseline.predict(X_test))
+
+
+def test_zero_weight_node_becomes_leaf():
+    X = np.array([[0.0], [1.0], [2.0], [3.0]])
+    y = np.array([0, 1, 0, 1])
+    for max_bins in (None, 8):
+        tree = DecisionTree(random_state=0, max_bins=max_bins)
+        tree.fit(X, y, sample_weight=np.array([1.0, 1.0, 0.0, 0.0]))
+        np.testing.assert_array_equal(tree.predict(X[:2]), [0, 1])
@@ -0,0 +1,25 @@
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, classification_report
+
+from model_knn import KNN
+from model_artifact import FEATURE_NAMES, save_artifact
+from prepare_data import load_prepared
+
+# Dataset terenkode dari cache (encoding sama seperti train_model.py, supaya artifact bisa dipakai app.py)
+X, y, label_encoders = load_prepared()
+X = pd.DataFrame(X, columns=FEATURE_NAMES)
+
+X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+# KNN dengan k=2 pada Age, Height, Weight yang dinormalisasi (seperti di notebook)
+features = [list(X.columns).index(col) for col in ['Age', 'Height', 'Weight']]
+knn = KNN(k=2, metric='euclidean', features=features, scale=True, index='kd_tree')
+knn.fit(X_train, y_train)
+y_pred = knn.predict(X_test)
+
+print("Akurasi:", accuracy_score(y_test, y_pred))
+print("Laporan Klasifikasi:\n", classification_report(y_test, y_pred))
+
+save_artifact('models/model_knn', knn, label_encoders, list(X.columns))
+print("Artifact KNN berhasil disimpan di 'models/model_knn'")
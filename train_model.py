@@ -1,5 +1,4 @@
 import pandas as pd
-from sklearn.preprocessing import LabelEncoder, OneHotEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import matplotlib.pyplot as plt
@@ -8,6 +7,9 @@ import joblib
 
 # Import kelas-kelas kustom dari model.py
 from model_randomforest import *
+from model_artifact import FEATURE_NAMES, save_artifact
+from prepare_data import load_prepared
+from profiling import PROFILER
 
 def accuracy(y_true, y_pred):
     """
@@ -23,36 +25,31 @@ def accuracy(y_true, y_pred):
     accuracy = np.sum(y_true == y_pred) / len(y_true)
     return accuracy
 
-# Memuat dataset
-data_obesitas = pd.read_csv('ObesityDataSet_raw_and_data_sinthetic.csv')
-
-# Menghapus duplikat
-data_obesitas.drop_duplicates(inplace=True)
-
-# Encoding label dengan LabelEncoder terpisah untuk setiap kolom
-label = ['Gender','family_history_with_overweight','FAVC','CAEC','SMOKE','SCC','CALC','MTRANS','NObeyesdad']
-label_encoders = {}
-for col in label:
-    le = LabelEncoder()
-    data_obesitas[col] = le.fit_transform(data_obesitas[col])
-    label_encoders[col] = le
-
-# Menghitung BMI
-data_obesitas['BMI'] = round(data_obesitas['Weight'] / (data_obesitas['Height']) ** 2, 2)
+# Memuat dataset terenkode (hapus duplikat, LabelEncoder per kolom, BMI) dari cache prepare_data.py;
+# cache dibangun ulang otomatis jika CSV atau pipeline berubah
+with PROFILER.stage('train.load_data'):
+    X, y, label_encoders = load_prepared()
 
 # Menyimpan label_encoders untuk digunakan di app.py
 joblib.dump(label_encoders, 'label_encoders.joblib')
 
 # Memisahkan fitur dan target
-X = data_obesitas.drop(columns=['NObeyesdad'])
-y = data_obesitas.pop('NObeyesdad')
+X = pd.DataFrame(X, columns=FEATURE_NAMES)
+y = pd.Series(y, name='NObeyesdad')
 
 # Membagi data menjadi training dan testing
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
 # Melatih model RandomForest
-clf = RandomForest(n_trees=300,max_depth=20,min_samples_split=2)
+clf = RandomForest(n_trees=300,max_depth=20,min_samples_split=2,n_jobs=-1,random_state=42,oob_score=True)
 clf.fit(X_train, y_train)
+
+# Estimasi akurasi out-of-bag, dihitung selama training tanpa data uji terpisah
+print("Akurasi OOB:", clf.oob_score_)
+
+# Fitur paling berpengaruh (mean decrease in impurity, dicatat selama training)
+importances = pd.Series(clf.feature_importances_, index=X.columns).sort_values(ascending=False)
+print("Feature importance:\n", importances.head(10))
 y_pred = clf.predict(X_test)
 
 # Menghitung akurasi menggunakan fungsi manual
@@ -74,7 +71,17 @@ plt.title('Confusion Matrix')
 plt.show()
 
 # Menyimpan model menggunakan joblib
-joblib.dump(clf, 'model_random_forest.joblib')
+with PROFILER.stage('train.save'):
+    joblib.dump(clf, 'model_random_forest.joblib')
+
+    # Menyimpan model dan encoders sebagai artifact berversi (dimuat app.py dengan mmap)
+    save_artifact('models/model_random_forest', clf, label_encoders, list(X.columns))
 
 print("Model berhasil dilatih dan disimpan sebagai 'model_random_forest.joblib'")
 print("Label encoders berhasil disimpan sebagai 'label_encoders.joblib'")
+print("Artifact berhasil disimpan di 'models/model_random_forest'")
+
+# Laporan profiling (waktu per tahap, statistik pohon, memori puncak) jika OBESITY_PROFILE diset
+if PROFILER.enabled:
+    PROFILER.export('profile_train.json')
+    print("Laporan profiling disimpan di 'profile_train.json'")